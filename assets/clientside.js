@@ -0,0 +1,123 @@
+// Client side callbacks, used in client side maps mode (OLYMPICSDASH_CLIENTSIDE_MAPS=1)
+// and throttled slider mode (OLYMPICSDASH_SLIDER_THROTTLE=1)
+// and compact figures mode (OLYMPICSDASH_COMPACT_FIGURES=1)
+
+// Compact figure decoding, the reverse of figure_encoding.py
+const typed_arrays = {"f4": Float32Array, "i4": Int32Array};
+
+function is_object(value) {
+    return value !== null && typeof value === "object" && !Array.isArray(value);
+}
+
+// Unpack typed arrays ({dtype, bdata}) and joined strings ({strings, sep})
+function unpack(value) {
+    if (Array.isArray(value)) {
+        return value.map(unpack);
+    }
+    if (!is_object(value)) {
+        return value;
+    }
+    if ("bdata" in value) {
+        const bytes = Uint8Array.from(atob(value.bdata), c => c.charCodeAt(0));
+        return Array.from(new typed_arrays[value.dtype](bytes.buffer));
+    }
+    if ("strings" in value) {
+        return value.strings.split(value.sep);
+    }
+    const unpacked = {};
+    for (const key in value) {
+        unpacked[key] = unpack(value[key]);
+    }
+    return unpacked;
+}
+
+// Add back the properties removed because they were equal to their default
+function merge_defaults(defaults, value) {
+    if (!is_object(defaults) || !is_object(value)) {
+        return value;
+    }
+    const merged = Object.assign({}, defaults);
+    for (const key in value) {
+        merged[key] = merge_defaults(defaults[key], value[key]);
+    }
+    return merged;
+}
+
+function decode_figure(figure, figure_defaults) {
+    return {
+        layout: merge_defaults(figure_defaults.layout, unpack(figure.layout)),
+        data: figure.data.map(trace => merge_defaults(figure_defaults.trace, unpack(trace)))
+    };
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    olympicsdash: {
+        // When a map selection button is clicked, the clicked button is disabled and all others enabled
+        update_buttons: function(gold_click, silver_click, bronze_click, all_click) {
+            const clicks = [gold_click, silver_click, bronze_click, all_click];
+            // Index of the highest value (latest click)
+            const clicked_button = clicks.indexOf(Math.max(...clicks));
+            return clicks.map((click, button) => button === clicked_button);
+        },
+
+        // Show the figure of the selected year from the yearly figures sent by the server (map-store)
+        // In year range mode the server sends the figure of the selected range instead (range-map)
+        // The figures are decoded first in compact figures mode (figure_defaults is given)
+        update_graph: function(select_year, pib_toggle, map_store, range_map, figure_defaults) {
+            const no_update = window.dash_clientside.no_update;
+            if (range_map) {
+                const figure = range_map.figure;
+                return [range_map.name, figure_defaults ? decode_figure(figure, figure_defaults) : figure];
+            }
+            if (!map_store) {
+                return [no_update, no_update];
+            }
+            const selected_map = map_store[pib_toggle && pib_toggle.length > 0 ? "pib" : "continent"];
+            const figure = selected_map.figures[select_year];
+            if (!figure) {
+                return [selected_map.name, no_update];
+            }
+            return [selected_map.name, figure_defaults ? decode_figure(figure, figure_defaults) : figure];
+        },
+
+        // Decode the compact figure sent by the server (compact figures mode)
+        // Maps of a year without filters are sent as the URL of their figure, fetched through the HTTP cache
+        // of the browser, which only downloads them again if they changed (ETag)
+        decode_figure: function(figure, figure_defaults) {
+            const no_update = window.dash_clientside.no_update;
+            if (!figure) {
+                return no_update;
+            }
+            // Figures fetched after another figure was sent are dropped, they can arrive out of order
+            window.olympicsdash_map_url = figure.url;
+            if (!figure.url) {
+                return decode_figure(figure, figure_defaults);
+            }
+            return fetch(figure.url).then(response => response.json()).then(payload =>
+                figure.url === window.olympicsdash_map_url ? decode_figure(payload, figure_defaults) : no_update);
+        },
+
+        // Request the selected year once the slider has stayed on it for delay seconds (throttled slider mode)
+        // Years superseded by a newer slider move meanwhile are never sent to the server
+        request_year: function(select_year, year_request) {
+            const no_update = window.dash_clientside.no_update;
+            if (select_year === undefined || select_year === null) {
+                return no_update;
+            }
+            const requests = window.olympicsdash_requests = window.olympicsdash_requests || {seq: 0};
+            const seq = ++requests.seq;
+            const delay = year_request ? year_request.delay : 0;
+            return new Promise(resolve => setTimeout(
+                () => resolve(seq === requests.seq ? {year: select_year, delay: delay} : no_update), delay * 1000));
+        },
+
+        // Show the selected year, or the selected range of years in year range mode
+        print_year: function(select_year, selected_year, range_toggle, select_range) {
+            if (range_toggle && range_toggle.length > 0 && select_range) {
+                const years = select_range.slice().sort((first, second) => first - second);
+                return years[0] + "-" + years[1];
+            }
+            return select_year ? String(select_year) : selected_year;
+        }
+    }
+});
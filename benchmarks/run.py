@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+from benchmarks.synthetic import generate, ATHLETES_FILE
+
+# Runs the scenarios of benchmarks/scenarios.py on synthetic data of every scale and writes the results as JSON
+# Results can be compared with those of a previous run, to find the scenarios that got slower
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(REPO_DIR, "benchmarks", "data")
+RESULTS_PATH = os.path.join(REPO_DIR, "benchmarks", "results.json")
+# A scenario is reported as a regression when its median time grows more than this fraction
+REGRESSION_THRESHOLD = 0.25
+
+
+def get_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_scale_name(scale):
+    return f"{scale:g}x"
+
+
+# Runs the scenarios of a scale in their own process, with its synthetic data as the datasets folder
+def run_scale(scale, repeat, data_dir, regenerate):
+    res_dir = os.path.join(data_dir, get_scale_name(scale), "res")
+    if regenerate or not os.path.exists(os.path.join(res_dir, ATHLETES_FILE)):
+        print(f"[INFO] Generating synthetic data at scale {get_scale_name(scale)}")
+        generate(res_dir, scale)
+    print(f"[INFO] Running scenarios at scale {get_scale_name(scale)}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, "results.json")
+        subprocess.run([sys.executable, "-m", "benchmarks.scenarios", "--repeat", str(repeat), "--output", output_path],
+                       cwd=REPO_DIR, env=dict(os.environ, OLYMPICSDASH_RES=res_dir), check=True)
+        with open(output_path) as output_file:
+            return json.load(output_file)
+
+
+# Scenarios whose median time grew more than the threshold: (scale, scenario, old median, new median)
+def get_regressions(baseline, results, threshold=REGRESSION_THRESHOLD):
+    regressions = []
+    for scale, scenarios in results["scales"].items():
+        for name, result in scenarios.items():
+            old = baseline["scales"].get(scale, {}).get(name)
+            if old and result["median"] > old["median"] * (1 + threshold):
+                regressions.append((scale, name, old["median"], result["median"]))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the dashboard pipeline on synthetic data")
+    parser.add_argument("-s", "--scales", type=float, nargs="+", default=[1],
+                        help="sizes of the synthetic data, 1 = as the real data (default: 1, e.g. 1 10 100)")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="times every scenario is run (default: 3)")
+    parser.add_argument("-o", "--output", default=RESULTS_PATH, help="JSON file the results are written to")
+    parser.add_argument("-b", "--baseline", help="results of a previous run to compare with")
+    parser.add_argument("-t", "--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help=f"slowdown reported as a regression (default: {REGRESSION_THRESHOLD})")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="folder of the synthetic data")
+    parser.add_argument("--regenerate", action="store_true", help="generate the synthetic data even if it exists")
+    args = parser.parse_args()
+
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "scales": {get_scale_name(scale): run_scale(scale, args.repeat, args.data_dir, args.regenerate)
+                   for scale in args.scales}
+    }
+    with open(args.output, "w") as output_file:
+        json.dump(results, output_file, indent=4)
+    print(f"[SUCCESS] Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = get_regressions(json.load(baseline_file), results, args.threshold)
+        for scale, name, old, new in regressions:
+            print(f"[REGRESSION] {scale} {name}: {old:.4f}s -> {new:.4f}s")
+        if regressions:
+            sys.exit(1)
+        print("[SUCCESS] No regressions")
@@ -0,0 +1,178 @@
+import argparse
+import json
+import os
+import statistics
+import time
+
+import pandas as pd
+
+import dataset_preprocessor
+import main
+from build_datasets import DATASETS, build_datasets, get_stages
+from dataset_generators.medals_dataset import MedalsDataset
+from dataset_generators.top_5_sports_dataset import Top5SportsDataset
+from utils import create_genre_graph, create_top5_graph, create_medals_country_graph, create_pib_graph
+
+# Timed scenarios of the whole pipeline, from the raw CSVs to the callbacks of the dashboard
+# Run by benchmarks/run.py in a process whose OLYMPICSDASH_RES points to the synthetic data, which is overwritten
+# Every scenario is run repeat times and its times (in seconds) are returned by name
+
+# Gold medals map selected in the update_graph scenarios, and number of country/year pairs in the panel scenarios
+BENCHMARK_BUTTONS = (True, False, False, False)
+BENCHMARK_PANELS = 50
+# Number of sports (the first one is every sport) in the medal cube scenarios
+BENCHMARK_SPORTS = 5
+# Latest years of the medals data ranked in the top 5 sports scenarios, the loop takes minutes for all of them
+BENCHMARK_TOP5_YEARS = 3
+
+
+def time_scenario(scenario, repeat, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        scenario()
+        times.append(time.perf_counter() - start)
+    return {"times": times, "min": min(times), "median": statistics.median(times)}
+
+
+def clear_figures():
+    main.generation.figure_cache.clear()
+    main.generation.medal_table = None
+    main.generation.filtered_tables.clear()
+    main.generation.range_table = None
+
+
+def remove_country_index():
+    index_path = dataset_preprocessor.COUNTRY_INDEX
+    for path in [index_path, dataset_preprocessor.get_country_index_fingerprint_path(index_path)]:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def get_scenarios():
+    scenarios = [
+        ("preprocess.country_index", lambda: dataset_preprocessor.build_country_index(), None),
+        ("preprocess.rows", lambda: dataset_preprocessor.preprocess(engine="rows"), None),
+        ("preprocess.table", lambda: dataset_preprocessor.preprocess(engine="table"), None)
+    ]
+    # Every dataset is built on its own, loading its input, in the order build_datasets.py builds them
+    for stage in get_stages(DATASETS):
+        for dataset in stage:
+            scenarios.append((f"build_dataset.{dataset.__name__}", dataset.build_dataset, None))
+    scenarios += [
+        ("build_datasets", lambda: build_datasets(force=True), None),
+        ("load_datasets", main.load_datasets, None),
+        ("init_figures", lambda: main.init_figures(main.generation), clear_figures),
+        ("init_figures.all", lambda: main.init_figures(main.generation, main.get_all_figures(main.generation)),
+         clear_figures)
+    ]
+    return scenarios
+
+
+# The per country callbacks used to be update_genre, update_sports, update_medals and update_pib,
+# now batched in update_panels: each graph is timed on its own too
+def get_callback_scenarios():
+    keys = list(main.generation.store.gender)[:BENCHMARK_PANELS]
+    store = main.generation.store
+    return [
+        ("update_graph.cold", lambda: [main.update_graph(year, *BENCHMARK_BUTTONS, ["Show PIB"])
+                                       for year in main.generation.years], clear_figures),
+        ("update_graph.warm", lambda: [main.update_graph(year, *BENCHMARK_BUTTONS, ["Show PIB"])
+                                       for year in main.generation.years], None),
+        ("update_panels.cold", lambda: [main.update_panels(year, {"points": [{"location": noc}]}) for year, noc in keys],
+         lambda: main.generation.panel_cache.clear()),
+        ("update_genre", lambda: [create_genre_graph(store.get_gender(year, noc)) for year, noc in keys], None),
+        ("update_sports", lambda: [create_top5_graph(store.get_top5(year, noc)) for year, noc in keys], None),
+        ("update_medals", lambda: [create_medals_country_graph(store.get_medals_country(year, noc))
+                                   for year, noc in keys], None),
+        ("update_pib", lambda: [create_pib_graph(store.get_pib(noc), year) for year, noc in keys], None)
+    ] + get_cube_scenarios() + get_range_scenarios()
+
+
+# Totals of every range of years starting at the first year, from the cumulative sums of the range store
+def get_range_scenarios():
+    years = main.generation.years
+    return [
+        ("range_store.totals", lambda: [main.generation.ranges.get_totals(years[0], year) for year in years], None),
+        ("update_graph.range", lambda: [main.update_graph(year, *BENCHMARK_BUTTONS, ["Show PIB"], "All", "All",
+                                                          ["Year range"], [years[0], year]) for year in years],
+         clear_figures)
+    ]
+
+
+# Slices of the medal cube answering the sport and gender filters of the map, for every year of the first sports
+def get_cube_scenarios():
+    cube = main.generation.medal_cube
+    if cube is None:
+        return []
+    filters = [(year, sport, sex) for year in cube.years
+               for sport in cube.sports[:BENCHMARK_SPORTS] for sex in cube.sexes]
+    return [
+        ("medal_cube.slice", lambda: [cube.get_slice(*key) for key in filters], None),
+        ("update_graph.filtered", lambda: [main.update_graph(year, *BENCHMARK_BUTTONS, ["Show PIB"], sport, "F")
+                                           for year in main.generation.years for sport in cube.sports[1:2]],
+         clear_figures)
+    ]
+
+
+# Top 5 sports dataset as it was built before Top5SportsDataset.aggregate: nlargest on a boolean mask of every
+# (year, country) and a concat per row. Kept to compare both on the same medals data
+# Tied sports are not always in the same order: the loop keeps the order nlargest picks them in, aggregate sorts
+# them alphabetically
+def build_top5_loop(df):
+    df_top = df[["Year", "NOC", "Sport", "Medals"]].groupby(["Year", "NOC", "Sport"]).sum().reset_index()
+    years = df_top["Year"].unique()
+    countries = df_top["NOC"].unique()
+    cols = ["Year", "NOC", "Sport 1", "Medals 1", "Sport 2", "Medals 2", "Sport 3",
+            "Medals 3", "Sport 4", "Medals 4", "Sport 5", "Medals 5"]
+    output_df = pd.DataFrame([], columns=cols)
+    for year in years:
+        for country in countries:
+            aux = df_top.loc[(df_top["Year"] == year) & (df_top["NOC"] == country)].nlargest(5, "Medals")
+            if aux["Medals"].sum() == 0:
+                continue
+            data = [year, country]
+            for i in range(5):
+                if i < len(aux) and aux.iloc[i, 3] != 0:
+                    data += [aux.iloc[i, 2], aux.iloc[i, 3]]
+                else:
+                    data += ["", ""]
+            output_df = pd.concat([output_df, pd.DataFrame([data], columns=cols)], ignore_index=True)
+    return output_df
+
+
+# Old and new way of building the top 5 sports dataset, from the medals dataset written by build_datasets
+def get_top5_scenarios():
+    df = MedalsDataset.load_data()
+    df = df[df["Year"].isin(sorted(df["Year"].unique())[-BENCHMARK_TOP5_YEARS:])]
+    # Loaded as in the pipeline before the dataset schemas: plain strings and integers
+    df = df.astype({"NOC": str, "Sport": str, "Medals": int})
+    return [
+        ("top5.loop", lambda: build_top5_loop(df), None),
+        ("top5.aggregate", lambda: Top5SportsDataset.aggregate(df), None)
+    ]
+
+
+def run_scenarios(repeat):
+    results = {}
+    # The country index is built by the first scenario, as in a first run of the preprocessor
+    remove_country_index()
+    for name, scenario, setup in get_scenarios():
+        results[name] = time_scenario(scenario, repeat, setup)
+        print(f"[INFO] {name}: {results[name]['median']:.4f}s")
+    # Callbacks run on the data loaded by the load_datasets scenario, the rest on the datasets it loaded
+    for name, scenario, setup in get_callback_scenarios() + get_top5_scenarios():
+        results[name] = time_scenario(scenario, repeat, setup)
+        print(f"[INFO] {name}: {results[name]['median']:.4f}s")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs the timed scenarios on the data in OLYMPICSDASH_RES")
+    parser.add_argument("--repeat", type=int, default=3, help="times every scenario is run (default: 3)")
+    parser.add_argument("--output", required=True, help="JSON file the results are written to")
+    args = parser.parse_args()
+    with open(args.output, "w") as output_file:
+        json.dump(run_scenarios(args.repeat), output_file, indent=4)
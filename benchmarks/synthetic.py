@@ -0,0 +1,145 @@
+import argparse
+import csv
+import os
+
+import numpy as np
+import pandas as pd
+
+# Synthetic inputs for dataset_preprocessor.py, shaped like the real ones:
+# - athlete_events.csv: one row per athlete and event, with the empty PIB and Continent columns to be filled
+# - The World Bank GDP CSV: one row per country (and region) with a column per year from 1960 to 2021
+# At scale 1 the athletes CSV has as many rows as the real one, larger scales repeat its distributions
+ATHLETES_FILE = "athlete_events.csv"
+PIB_FILE = "API_NY.GDP.MKTP.CD_DS2_en_csv_v2_4683825.csv"
+ATHLETE_ROWS = 271116
+ATHLETES_HEADERS = ["ID", "Name", "Sex", "Age", "Height", "Weight", "Team", "NOC", "Games", "Year", "Season", "City",
+                    "Sport", "Event", "Medal", "PIB", "Continent"]
+PIB_YEARS = range(1960, 2022)
+# Rows generated and written at once, memory use does not depend on the scale
+CHUNK_ROWS = 500000
+
+# (NOC, team name in the athletes CSV, country name in the World Bank CSV, country code in the World Bank CSV)
+# Includes codes replaced by the preprocessor (GER, NED, SUI, ...) and countries that no longer exist (URS, GDR, ...)
+COUNTRIES = [
+    ("USA", "United States", "United States", "USA"), ("GBR", "Great Britain", "United Kingdom", "GBR"),
+    ("FRA", "France", "France", "FRA"), ("ITA", "Italy", "Italy", "ITA"), ("GER", "Germany", "Germany", "DEU"),
+    ("CAN", "Canada", "Canada", "CAN"), ("JPN", "Japan", "Japan", "JPN"), ("SWE", "Sweden", "Sweden", "SWE"),
+    ("AUS", "Australia", "Australia", "AUS"), ("HUN", "Hungary", "Hungary", "HUN"),
+    ("POL", "Poland", "Poland", "POL"), ("SUI", "Switzerland", "Switzerland", "CHE"),
+    ("NED", "Netherlands", "Netherlands", "NLD"), ("FIN", "Finland", "Finland", "FIN"),
+    ("ESP", "Spain", "Spain", "ESP"), ("CHN", "China", "China", "CHN"), ("NOR", "Norway", "Norway", "NOR"),
+    ("AUT", "Austria", "Austria", "AUT"), ("BEL", "Belgium", "Belgium", "BEL"), ("ROU", "Romania", "Romania", "ROU"),
+    ("BRA", "Brazil", "Brazil", "BRA"), ("KOR", "South Korea", "Korea, Rep.", "KOR"),
+    ("DEN", "Denmark", "Denmark", "DNK"), ("MEX", "Mexico", "Mexico", "MEX"), ("ARG", "Argentina", "Argentina", "ARG"),
+    ("GRE", "Greece", "Greece", "GRC"), ("CUB", "Cuba", "Cuba", "CUB"), ("BUL", "Bulgaria", "Bulgaria", "BGR"),
+    ("NZL", "New Zealand", "New Zealand", "NZL"), ("IND", "India", "India", "IND"), ("EGY", "Egypt", "Egypt, Arab Rep.", "EGY"),
+    ("RSA", "South Africa", "South Africa", "ZAF"), ("POR", "Portugal", "Portugal", "PRT"),
+    ("TUR", "Turkey", "Turkiye", "TUR"), ("IRL", "Ireland", "Ireland", "IRL"), ("ISR", "Israel", "Israel", "ISR"),
+    ("KEN", "Kenya", "Kenya", "KEN"), ("NGR", "Nigeria", "Nigeria", "NGA"), ("ETH", "Ethiopia", "Ethiopia", "ETH"),
+    ("MAR", "Morocco", "Morocco", "MAR"), ("COL", "Colombia", "Colombia", "COL"), ("CHI", "Chile", "Chile", "CHL"),
+    ("PER", "Peru", "Peru", "PER"), ("VEN", "Venezuela", "Venezuela, RB", "VEN"), ("JAM", "Jamaica", "Jamaica", "JAM"),
+    ("IRI", "Iran", "Iran, Islamic Rep.", "IRN"), ("INA", "Indonesia", "Indonesia", "IDN"),
+    ("PHI", "Philippines", "Philippines", "PHL"), ("THA", "Thailand", "Thailand", "THA"),
+    ("KAZ", "Kazakhstan", "Kazakhstan", "KAZ"), ("UKR", "Ukraine", "Ukraine", "UKR"), ("CZE", "Czech Republic", "Czechia", "CZE"),
+    ("CRO", "Croatia", "Croatia", "HRV"), ("SRB", "Serbia", "Serbia", "SRB"), ("SLO", "Slovenia", "Slovenia", "SVN"),
+    ("EST", "Estonia", "Estonia", "EST"), ("LAT", "Latvia", "Latvia", "LVA"), ("LTU", "Lithuania", "Lithuania", "LTU"),
+    ("ISL", "Iceland", "Iceland", "ISL"), ("LUX", "Luxembourg", "Luxembourg", "LUX"), ("MGL", "Mongolia", "Mongolia", "MNG"),
+    ("BAH", "Bahamas", "Bahamas, The", "BHS"), ("ZIM", "Zimbabwe", "Zimbabwe", "ZWE"), ("URU", "Uruguay", "Uruguay", "URY"),
+    ("URS", "Soviet Union", None, None), ("GDR", "East Germany", None, None), ("FRG", "West Germany", None, None),
+    ("YUG", "Yugoslavia", None, None), ("TCH", "Czechoslovakia", None, None), ("EUN", "Unified Team", None, None)
+]
+# Regions of the World Bank CSV, never matched by an athlete
+REGIONS = [("World", "WLD"), ("Europe & Central Asia", "ECS"), ("Sub-Saharan Africa", "SSF"), ("High income", "HIC")]
+
+SUMMER_YEARS = list(range(1896, 2017, 4))
+WINTER_YEARS = list(range(1924, 1993, 4)) + list(range(1994, 2015, 4))
+SPORTS = [f"Sport {i}" for i in range(66)]
+MEDALS = ["Gold", "Silver", "Bronze", "NA"]
+MEDAL_WEIGHTS = [0.049, 0.048, 0.049, 0.854]
+
+
+def get_year_weights(years):
+    # More athletes took part in the latest games
+    weights = np.linspace(1, 6, len(years))
+    return weights / weights.sum()
+
+
+def get_country_weights(rng):
+    weights = rng.pareto(1.2, len(COUNTRIES)) + 1
+    return weights / weights.sum()
+
+
+def generate_athletes_chunk(rng, first_id, rows, country_weights):
+    countries = rng.choice(len(COUNTRIES), rows, p=country_weights)
+    winter = rng.random(rows) < 0.2
+    years = np.where(winter, rng.choice(WINTER_YEARS, rows, p=get_year_weights(WINTER_YEARS)),
+                     rng.choice(SUMMER_YEARS, rows, p=get_year_weights(SUMMER_YEARS)))
+    seasons = np.where(winter, "Winter", "Summer")
+    teams = np.array([team for _, team, _, _ in COUNTRIES], dtype=object)[countries]
+    # Some teams are shared by several countries ("Country/Other")
+    shared = rng.random(rows) < 0.01
+    teams[shared] = teams[shared] + "/Other"
+    sports = pd.Series(np.array(SPORTS, dtype=object)[rng.choice(len(SPORTS), rows)])
+    ids = np.arange(first_id, first_id + rows)
+    return pd.DataFrame({
+        "ID": ids,
+        "Name": "Athlete " + pd.Series(ids).astype(str),
+        "Sex": rng.choice(["M", "F"], rows, p=[0.725, 0.275]),
+        "Age": rng.integers(14, 45, rows),
+        "Height": rng.integers(150, 205, rows),
+        "Weight": rng.integers(45, 120, rows),
+        "Team": teams,
+        "NOC": np.array([noc for noc, _, _, _ in COUNTRIES])[countries],
+        "Games": pd.Series(years).astype(str) + " " + seasons,
+        "Year": years,
+        "Season": seasons,
+        "City": "City",
+        "Sport": sports,
+        "Event": sports + " Event " + pd.Series(rng.integers(0, 10, rows)).astype(str),
+        "Medal": rng.choice(MEDALS, rows, p=MEDAL_WEIGHTS),
+        "PIB": "",
+        "Continent": ""
+    })
+
+
+def write_athletes(path, scale, rng):
+    rows = int(ATHLETE_ROWS * scale)
+    country_weights = get_country_weights(rng)
+    with open(path, "w", newline="") as athletes_file:
+        athletes_file.write(",".join(f'"{header}"' for header in ATHLETES_HEADERS) + "\n")
+        for first_id in range(0, rows, CHUNK_ROWS):
+            chunk = generate_athletes_chunk(rng, first_id + 1, min(CHUNK_ROWS, rows - first_id), country_weights)
+            chunk.to_csv(athletes_file, header=False, index=False)
+
+
+# GDPs grow every year from a random base, with the first years missing for some countries
+def write_pibs(path, rng):
+    with open(path, "w", newline="", encoding="utf-8-sig") as pib_file:
+        pib_writer = csv.writer(pib_file, quoting=csv.QUOTE_ALL, lineterminator=",\n")
+        pib_writer.writerow(["Country Name", "Country Code", "Indicator Name", "Indicator Code"] +
+                            [str(year) for year in PIB_YEARS])
+        countries = [(name, code) for _, _, name, code in COUNTRIES if name] + REGIONS
+        for name, code in countries:
+            base = 10 ** rng.uniform(8.5, 12)
+            growth = rng.uniform(1.01, 1.09)
+            first_year = rng.choice([1960, 1960, 1970, 1990])
+            pibs = [repr(base * growth ** (year - 1960)) if year >= first_year else "" for year in PIB_YEARS]
+            pib_writer.writerow([name, code, "GDP (current US$)", "NY.GDP.MKTP.CD"] + pibs)
+
+
+def generate(output_dir, scale=1, seed=0):
+    os.makedirs(output_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    write_pibs(os.path.join(output_dir, PIB_FILE), rng)
+    write_athletes(os.path.join(output_dir, ATHLETES_FILE), scale, rng)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Writes synthetic inputs for dataset_preprocessor.py")
+    parser.add_argument("output_dir", help="folder the CSVs are written to")
+    parser.add_argument("-s", "--scale", type=float, default=1,
+                        help=f"size of the athletes CSV, 1 = {ATHLETE_ROWS} rows as the real one (default: 1)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    args = parser.parse_args()
+    generate(args.output_dir, args.scale, args.seed)
+    print(f"[SUCCESS] Synthetic data written to {args.output_dir}")
@@ -1,12 +1,152 @@
+import argparse
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 from dataset_generators.base_dataset import BaseDataset
 from dataset_generators.medals_dataset import MedalsDataset
+from dataset_generators.medals_country_dataset import MedalsCountryDataset
 from dataset_generators.gender_dataset import GenderDataset
 from dataset_generators.top_5_sports_dataset import Top5SportsDataset
 from dataset_generators.pib_dataset import PIBDataset
+from dataset_generators.map_figures_dataset import MapFiguresDataset
+from dataset_generators.medal_cube_dataset import MedalCubeDataset
+from dataset_generators.dataset_cache import fingerprint, get_res_path
+
+# All the datasets built by this script
+# Each dataset declares the files it reads (get_inputs) and writes (get_outputs),
+# which is used to find the order they have to be built in and which of them are outdated
+DATASETS = [MedalsDataset, MedalsCountryDataset, GenderDataset, Top5SportsDataset, PIBDataset, MapFiguresDataset,
+            MedalCubeDataset]
+
+# Stores the fingerprints of the inputs and outputs of every dataset the last time it was built
+MANIFEST_PATH = get_res_path("build_manifest.json")
+
+# In memory data shared with the datasets being built, indexed by file path
+# Filled before the worker processes are started so forked workers inherit it instead of loading it again
+# Workers started otherwise (spawn on Windows and macOS) begin with it empty and load it in init_build_worker
+SHARED_DATA = {}
+
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    with open(MANIFEST_PATH) as manifest_file:
+        return json.load(manifest_file)
+
+
+def save_manifest(manifest):
+    with open(MANIFEST_PATH, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=4, sort_keys=True)
+
+
+# Groups the datasets in stages, every dataset only depends on datasets from previous stages
+# Datasets in the same stage are independent from each other and can be built at the same time
+def get_stages(datasets):
+    producers = {output: dataset for dataset in datasets for output in dataset.get_outputs()}
+    pending = list(datasets)
+    built = set()
+    stages = []
+    while pending:
+        stage = [dataset for dataset in pending
+                 if all(producers.get(path) in built or path not in producers for path in dataset.get_inputs())]
+        if not stage:
+            raise ValueError("Circular dependency between datasets: " + ", ".join(d.__name__ for d in pending))
+        stages.append(stage)
+        built.update(stage)
+        pending = [dataset for dataset in pending if dataset not in stage]
+    return stages
+
+
+# A dataset is up to date if its inputs have not changed since it was last built and its outputs were not modified
+def is_up_to_date(dataset, manifest, fingerprints):
+    entry = manifest.get(dataset.__name__)
+    if not entry:
+        return False
+    inputs = {path: fingerprints[path] for path in dataset.get_inputs()}
+    outputs = {path: fingerprint(path) for path in dataset.get_outputs()}
+    return None not in outputs.values() and entry["inputs"] == inputs and entry["outputs"] == outputs
+
+
+# Builds a dataset, using the data of its first input if it was already loaded
+# Runs inside the worker processes, so the dataset is passed by name
+def build_dataset(dataset_name):
+    dataset = next(dataset for dataset in DATASETS if dataset.__name__ == dataset_name)
+    source_df = SHARED_DATA.get(dataset.get_inputs()[0])
+    return dataset.build_dataset(source_df)
+
+
+# Runs once in every worker process before it builds any dataset
+# Forked workers already have the shared base data, other workers load it from the columnar artifact written
+# when the main process loaded it, which is much faster than parsing the base dataset CSV again
+def init_build_worker(shared_paths):
+    base_path = BaseDataset.get_outputs()[0]
+    if base_path in shared_paths and base_path not in SHARED_DATA:
+        SHARED_DATA[base_path] = BaseDataset.load_shared_data()
+
+
+def build_stage(stage, jobs):
+    if jobs == 1 or len(stage) == 1:
+        for dataset in stage:
+            output_df = build_dataset(dataset.__name__)
+            SHARED_DATA[dataset.get_outputs()[0]] = output_df
+    else:
+        # Only the base data is passed on to the workers, datasets built from other inputs load them from disk
+        shared_paths = [path for path in SHARED_DATA if path in BaseDataset.get_outputs()]
+        if multiprocessing.get_start_method() != "fork" and shared_paths:
+            print(f"[INFO] Workers load dataset '{BaseDataset.get_name()}' from its columnar copy")
+        with ProcessPoolExecutor(max_workers=min(jobs, len(stage)), initializer=init_build_worker,
+                                 initargs=(shared_paths,)) as executor:
+            # Results are not sent back to avoid pickling the data, later stages load the written files
+            list(executor.map(build_dataset, [dataset.__name__ for dataset in stage]))
+
+
+def build_datasets(datasets=DATASETS, jobs=None, force=False):
+    jobs = jobs or os.cpu_count()
+    manifest = load_manifest()
+    fingerprints = {}
+    for stage in get_stages(datasets):
+        # Fingerprints are taken once the previous stages are built
+        for dataset in stage:
+            for path in dataset.get_inputs():
+                if path not in fingerprints:
+                    fingerprints[path] = fingerprint(path)
+        outdated = []
+        for dataset in stage:
+            if not force and is_up_to_date(dataset, manifest, fingerprints):
+                print(f"[INFO] Dataset '{dataset.get_name()}' is up to date")
+            else:
+                outdated.append(dataset)
+        if not outdated:
+            continue
+
+        # The base dataset is parsed once, with its indicator columns, for all the datasets reading it
+        if any(dataset.get_inputs()[0] in BaseDataset.get_outputs() for dataset in outdated):
+            base_path = BaseDataset.get_outputs()[0]
+            if base_path not in SHARED_DATA:
+                print(f"[INFO] Loading dataset '{BaseDataset.get_name()}'")
+                SHARED_DATA[base_path] = BaseDataset.load_shared_data()
+
+        for dataset in outdated:
+            print(f"[INFO] Building dataset '{dataset.get_name()}'")
+        build_stage(outdated, jobs)
+
+        for dataset in outdated:
+            manifest[dataset.__name__] = {
+                "inputs": {path: fingerprints[path] for path in dataset.get_inputs()},
+                "outputs": {path: fingerprint(path) for path in dataset.get_outputs()}
+            }
+            for path in dataset.get_outputs():
+                fingerprints[path] = manifest[dataset.__name__]["outputs"][path]
+        save_manifest(manifest)
+
 
 if __name__ == "__main__":
-    build_datasets = [MedalsDataset, GenderDataset, Top5SportsDataset, PIBDataset]
-    for dataset in build_datasets:
-        print(f"[INFO] Building dataset '{dataset.get_name()}'")
-        dataset.build_dataset()
+    parser = argparse.ArgumentParser(description="Builds the datasets used by the dashboard")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="number of datasets built at the same time (default: number of CPUs)")
+    parser.add_argument("-f", "--force", action="store_true", help="rebuild all datasets even if up to date")
+    args = parser.parse_args()
+    build_datasets(jobs=args.jobs, force=args.force)
     print("[SUCCESS] All datasets built")
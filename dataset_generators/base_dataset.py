@@ -1,17 +1,49 @@
 import pandas as pd
 
+from dataset_generators.dataset_cache import load_dataset, get_res_path
+
 BASE_DATASET_NAME = "Athletes + PIB Dataset"
-BASE_DATASET_PATH = r".\res\athlete_events_with_pib.csv"
+BASE_DATASET_PATH = get_res_path("athlete_events_with_pib.csv")
+
+# Binary columns derived from the base dataset, shared by all the dataset generators
+# Each column is set to 1 when the source column matches the value
+MEDAL_INDICATORS = {"Gold": "Gold", "Silver": "Silver", "Bronze": "Bronze"}
+GENDER_INDICATORS = {"Women": "F", "Men": "M"}
 
 class BaseDataset:
     @staticmethod
     def get_name():
         return BASE_DATASET_NAME
 
+    # Built by dataset_preprocessor.py from the raw CSVs
+    @staticmethod
+    def get_inputs():
+        return []
+
+    @staticmethod
+    def get_outputs():
+        return [BASE_DATASET_PATH]
+
+    @staticmethod
+    def load_data(engine=None):
+        return load_dataset(BASE_DATASET_PATH, engine)
+
+    # Loads the base dataset together with all the indicator columns the generators need
+    # The columns are computed once with vectorized comparisons so every generator only has to group
+    @staticmethod
+    def load_shared_data(engine=None):
+        return BaseDataset.add_indicators(BaseDataset.load_data(engine))
+
+    # Adds the indicator columns to athlete rows of the base dataset
     @staticmethod
-    def load_data():
-        return pd.read_csv(BASE_DATASET_PATH, encoding="latin1")
+    def add_indicators(df):
+        for column, medal in MEDAL_INDICATORS.items():
+            df[column] = (df["Medal"] == medal).astype(int)
+        df["Medals"] = df[list(MEDAL_INDICATORS)].sum(axis=1)      # Won any medal
+        for column, sex in GENDER_INDICATORS.items():
+            df[column] = (df["Sex"] == sex).astype(int)
+        return df
 
     @staticmethod
     def build_dataset():
-        pass
\ No newline at end of file
+        pass
@@ -0,0 +1,111 @@
+import hashlib
+import os
+import tempfile
+
+import pandas as pd
+
+# Engine used by pandas to parse a dataset CSV when its columnar artifact can't be used
+# - "c": default pandas parser
+# - "pyarrow": multi-threaded parser, requires the pyarrow package
+# Can be overridden with the OLYMPICSDASH_CSV_ENGINE environment variable or per call
+CSV_ENGINE = os.environ.get("OLYMPICSDASH_CSV_ENGINE", "c")
+CSV_ENCODING = "latin1"
+
+# Folder holding the datasets: ".\res" on Windows, "./res" elsewhere
+# Can be overridden with the OLYMPICSDASH_RES environment variable, e.g. when the server is not started from the repo
+RES_DIR = os.environ.get("OLYMPICSDASH_RES", os.path.join(".", "res"))
+
+# Typed columnar copy (Feather) stored next to every dataset CSV
+ARTIFACT_EXTENSION = ".feather"
+
+
+# Path of a file in the datasets folder
+def get_res_path(file_name):
+    return os.path.join(RES_DIR, file_name)
+
+
+# Path of the columnar artifact of a dataset CSV
+def get_artifact_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ARTIFACT_EXTENSION
+
+
+# An artifact is only used if it is at least as recent as its CSV
+# If the CSV is missing the artifact is the only copy left, so it is used as is
+def is_artifact_fresh(csv_path):
+    artifact_path = get_artifact_path(csv_path)
+    if not os.path.exists(artifact_path):
+        return False
+    if not os.path.exists(csv_path):
+        return True
+    return os.path.getmtime(artifact_path) >= os.path.getmtime(csv_path)
+
+
+# Writes the columnar artifact of a dataset
+# It is written to a temporary file first so readers never see a half written artifact
+# The temporary file has a unique name, processes writing the same artifact at once (server workers, builds)
+# each write their own file and the last one replaces the artifact
+# Without pyarrow (or without write permissions) the CSV remains the only copy
+def write_artifact(df, csv_path):
+    artifact_path = get_artifact_path(csv_path)
+    temp_path = None
+    try:
+        temp_file, temp_path = tempfile.mkstemp(dir=os.path.dirname(artifact_path) or ".",
+                                                prefix=os.path.basename(artifact_path) + ".", suffix=".tmp")
+        os.close(temp_file)
+        # mkstemp makes the file readable by its owner only, artifacts are read like the CSVs next to them
+        os.chmod(temp_path, 0o644)
+        df.reset_index(drop=True).to_feather(temp_path)
+        os.replace(temp_path, artifact_path)
+    except (ImportError, OSError, ValueError, TypeError):
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+# Parses a dataset CSV
+def read_csv(csv_path, engine=None):
+    return pd.read_csv(csv_path, encoding=CSV_ENCODING, engine=engine or CSV_ENGINE)
+
+
+# Loads a dataset, preferring its columnar artifact and falling back to the CSV
+# When the CSV has to be parsed the artifact is refreshed for the next load
+def load_dataset(csv_path, engine=None):
+    if is_artifact_fresh(csv_path):
+        try:
+            return pd.read_feather(get_artifact_path(csv_path))
+        except (ImportError, OSError, ValueError):
+            pass
+    df = read_csv(csv_path, engine)
+    write_artifact(df, csv_path)
+    return df
+
+
+# Saves a dataset as CSV together with its columnar artifact
+# The artifact is built from the parsed CSV so both copies load with the exact same columns and types
+def save_dataset(df, csv_path, engine=None):
+    df.to_csv(csv_path, index=False)
+    write_artifact(read_csv(csv_path, engine), csv_path)
+
+
+# Removes the columnar artifact of a dataset whose CSV was modified, it is written again on the next load
+def remove_artifact(csv_path):
+    if os.path.exists(get_artifact_path(csv_path)):
+        os.remove(get_artifact_path(csv_path))
+
+
+# Appends rows to a dataset CSV, in the column order of its header
+def append_dataset(df, csv_path):
+    columns = pd.read_csv(csv_path, encoding=CSV_ENCODING, nrows=0).columns
+    df[columns].to_csv(csv_path, mode="a", header=False, index=False)
+    remove_artifact(csv_path)
+
+
+# Content hash of a dataset file, used to know when a dataset has to be rebuilt
+# Returns None for missing files
+def fingerprint(path, chunk_size=1 << 20):
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
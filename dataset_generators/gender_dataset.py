@@ -1,9 +1,13 @@
 import pandas as pd
 
-from dataset_generators.base_dataset import BaseDataset
+from dataset_generators.base_dataset import BaseDataset, BASE_DATASET_PATH
+from dataset_generators.dataset_cache import load_dataset, save_dataset, get_res_path
+from dataset_generators.schema import apply_schema, CATEGORY, SMALL_INT
 
 GENRE_DATASET_NAME = "PARTICIPATION PER GENDER"
-GENRE_DATASET_PATH = r".\res\gender_dataset.csv"
+GENRE_DATASET_PATH = get_res_path("gender_dataset.csv")
+# Column types applied when the dataset is loaded
+GENRE_DATASET_SCHEMA = {"Year": SMALL_INT, "NOC": CATEGORY, "Women": SMALL_INT, "Men": SMALL_INT}
 
 class GenderDataset:
     @staticmethod
@@ -11,13 +15,31 @@ class GenderDataset:
         return GENRE_DATASET_NAME
 
     @staticmethod
-    def load_data():
-        return pd.read_csv(GENRE_DATASET_PATH, encoding="latin1")
+    def get_inputs():
+        return [BASE_DATASET_PATH]
 
     @staticmethod
-    def build_dataset():
-        df = BaseDataset.load_data()
-        df["Women"] = df["Sex"].apply(lambda row: 1 if row == "F" else 0)
-        df["Men"] = df["Sex"].apply(lambda row: 1 if row == "M" else 0)
-        gender_df = df[["Year", "NOC", "Women", "Men"]].groupby(["Year", "NOC"]).sum().reset_index()
-        gender_df.to_csv(GENRE_DATASET_PATH, index=False)
\ No newline at end of file
+    def get_outputs():
+        return [GENRE_DATASET_PATH]
+
+    @staticmethod
+    def get_schema():
+        return GENRE_DATASET_SCHEMA
+
+    @staticmethod
+    def load_data(engine=None):
+        return apply_schema(load_dataset(GENRE_DATASET_PATH, engine), GENRE_DATASET_SCHEMA)
+
+    # Rows of the dataset for the given shared base data, without saving them
+    @staticmethod
+    def aggregate(df):
+        return df[["Year", "NOC", "Women", "Men"]].groupby(["Year", "NOC"]).sum().reset_index()
+
+    @staticmethod
+    def build_dataset(df=None):
+        # Reuse the shared base data when provided by the build pipeline
+        if df is None:
+            df = BaseDataset.load_shared_data()
+        gender_df = GenderDataset.aggregate(df)
+        save_dataset(gender_df, GENRE_DATASET_PATH)
+        return gender_df
\ No newline at end of file
@@ -0,0 +1,76 @@
+import json
+import os
+import shutil
+
+from dataset_generators.medals_dataset import MedalsDataset, MEDALS_DATASET_PATH
+from dataset_generators.dataset_cache import fingerprint, get_res_path
+from dataset_generators.medal_maps import medal_maps, build_medal_table, build_medals_figure
+
+MAP_FIGURES_DATASET_NAME = "MAP FIGURES"
+# Pre-serialized (JSON) map figures of every medal map and year
+# Figures are stored in a folder named after the content hash of the medals dataset they were built from
+MAP_FIGURES_DIR = get_res_path("map_figures")
+MAP_FIGURES_MANIFEST_PATH = os.path.join(MAP_FIGURES_DIR, "manifest.json")
+
+class MapFiguresDataset:
+    @staticmethod
+    def get_name():
+        return MAP_FIGURES_DATASET_NAME
+
+    @staticmethod
+    def get_inputs():
+        return [MEDALS_DATASET_PATH]
+
+    @staticmethod
+    def get_outputs():
+        return [MAP_FIGURES_MANIFEST_PATH]
+
+    # Loads the manifest of the figures: the hash of their medals dataset and the years built for every map
+    # Returns None if there are no figures or they were built from a different medals dataset
+    @staticmethod
+    def load_data():
+        if not os.path.exists(MAP_FIGURES_MANIFEST_PATH):
+            return None
+        with open(MAP_FIGURES_MANIFEST_PATH) as manifest_file:
+            manifest = json.load(manifest_file)
+        if manifest["source"] != fingerprint(MEDALS_DATASET_PATH):
+            return None
+        return manifest
+
+    # Loads the figure of a map in a year as a plotly figure dictionary, None if it was not built
+    @staticmethod
+    def load_figure(manifest, map_name, year):
+        if int(year) not in manifest["figures"].get(map_name, []):
+            return None
+        with open(get_figure_path(manifest["source"], map_name, year)) as figure_file:
+            return json.load(figure_file)
+
+    @staticmethod
+    def build_dataset(df=None):
+        # Reuse the medals data when provided by the build pipeline
+        if df is None:
+            df = MedalsDataset.load_data()
+        source = fingerprint(MEDALS_DATASET_PATH)
+        os.makedirs(os.path.join(MAP_FIGURES_DIR, source), exist_ok=True)
+        figures = {}
+        # All the maps are built from the same medal counts
+        medal_table = build_medal_table(df)
+        for map_name, medal_map in medal_maps.items():
+            figures[map_name] = []
+            for year in medal_table.get_years(medal_map["group"]):
+                figure = build_medals_figure(medal_table, medal_map["type"], medal_map["group"], year)
+                with open(get_figure_path(source, map_name, year), "w") as figure_file:
+                    figure_file.write(figure.to_json())
+                figures[map_name].append(int(year))
+        manifest = {"source": source, "figures": figures}
+        with open(MAP_FIGURES_MANIFEST_PATH, "w") as manifest_file:
+            json.dump(manifest, manifest_file)
+        # Figures built from previous medals datasets are no longer used
+        for folder in os.listdir(MAP_FIGURES_DIR):
+            if folder != source and os.path.isdir(os.path.join(MAP_FIGURES_DIR, folder)):
+                shutil.rmtree(os.path.join(MAP_FIGURES_DIR, folder))
+        return manifest
+
+
+def get_figure_path(source, map_name, year):
+    return os.path.join(MAP_FIGURES_DIR, source, f"{map_name}-{int(year)}.json")
@@ -0,0 +1,132 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from dataset_generators.base_dataset import BaseDataset, BASE_DATASET_PATH, MEDAL_INDICATORS
+from dataset_generators.dataset_cache import get_res_path
+
+MEDAL_CUBE_DATASET_NAME = "MEDAL CUBE"
+MEDAL_CUBE_DATASET_PATH = get_res_path("medal_cube.npz")
+# Rollup of a filter dimension: the medals of every sport or of both sexes
+ALL = "All"
+SEXES = ["F", "M"]
+MEDALS = list(MEDAL_INDICATORS)
+
+# Medal counts of every country and year over the sport and sex of the athletes, with their rollups
+# Stored as a dense array counts[year, noc, sport, sex, medal]:
+# - sports and sexes start with ALL, the sum of every sport or of both sexes
+# - medals are Gold, Silver and Bronze, their total is added up when a slice is taken
+# Every (year, noc) with athletes also has its continent and PIB (in billion USD), so the maps of a filter
+# are built from a slice of the cube without reading the athletes again
+class MedalCube:
+    def __init__(self, arrays):
+        self.counts = arrays["counts"]
+        self.years = [int(year) for year in arrays["years"]]
+        self.nocs = arrays["nocs"]
+        self.sports = [str(sport) for sport in arrays["sports"]]
+        self.sexes = [str(sex) for sex in arrays["sexes"]]
+        self.continents = arrays["continents"]
+        # Continent of every (year, noc), -1 if the country had no athletes that year
+        self.continent = arrays["continent"]
+        self.pib = arrays["pib"]
+        self.year_index = {year: i for i, year in enumerate(self.years)}
+        self.noc_index = {noc: i for i, noc in enumerate(self.nocs)}
+        self.sport_index = {sport: i for i, sport in enumerate(self.sports)}
+        self.sex_index = {sex: i for i, sex in enumerate(self.sexes)}
+
+    # Gold, Silver, Bronze and total medals of every country with athletes in a year, for a sport and a sex
+    # Returns the countries, their continents, their PIBs and a (countries, 4) array of counts
+    def get_slice(self, year, sport=ALL, sex=ALL):
+        year_position = self.year_index[year]
+        present = self.continent[year_position] >= 0
+        counts = self.counts[year_position, present, self.sport_index[sport], self.sex_index[sex]].astype(np.int64)
+        counts = np.column_stack([counts, counts.sum(axis=1)])
+        return (self.nocs[present], self.continents[self.continent[year_position, present]],
+                self.pib[year_position, present], counts)
+
+    # Sports with the most medals of a country from first_year to last_year, as [Sport 1, Medals 1, ...]
+    # Ties keep the alphabetical order of the sports and missing positions are None, as in the top 5 sports dataset
+    # Returns None if the country won no medals in the range
+    def get_top_sports(self, noc, first_year, last_year, count):
+        if noc not in self.noc_index:
+            return None
+        start = np.searchsorted(self.years, first_year, side="left")
+        end = np.searchsorted(self.years, last_year, side="right")
+        medals = self.counts[start:end, self.noc_index[noc], 1:, 0].sum(axis=(0, 2), dtype=np.int64)
+        ranking = [i for i in np.argsort(-medals, kind="stable")[:count] if medals[i] > 0]
+        if not ranking:
+            return None
+        top = [None] * (2 * count)
+        for position, i in enumerate(ranking):
+            top[2 * position:2 * position + 2] = [self.sports[i + 1], int(medals[i])]
+        return top
+
+
+class MedalCubeDataset:
+    @staticmethod
+    def get_name():
+        return MEDAL_CUBE_DATASET_NAME
+
+    @staticmethod
+    def get_inputs():
+        return [BASE_DATASET_PATH]
+
+    @staticmethod
+    def get_outputs():
+        return [MEDAL_CUBE_DATASET_PATH]
+
+    # Returns None if the cube was not built or is older than the base dataset, e.g. after a new edition is ingested
+    # If the base dataset is missing the cube is the only copy left, so it is used as is
+    @staticmethod
+    def load_data():
+        if not os.path.exists(MEDAL_CUBE_DATASET_PATH):
+            return None
+        if os.path.exists(BASE_DATASET_PATH) and \
+                os.path.getmtime(MEDAL_CUBE_DATASET_PATH) < os.path.getmtime(BASE_DATASET_PATH):
+            return None
+        with np.load(MEDAL_CUBE_DATASET_PATH, allow_pickle=False) as arrays:
+            return MedalCube(dict(arrays))
+
+    # Arrays of the cube for the given shared base data, without saving them
+    @staticmethod
+    def aggregate(df):
+        df = df[df["Sex"].isin(SEXES)]
+        year_codes, years = pd.factorize(df["Year"], sort=True)
+        noc_codes, nocs = pd.factorize(df["NOC"], sort=True)
+        sport_codes, sports = pd.factorize(df["Sport"], sort=True)
+        sex_codes = pd.Categorical(df["Sex"], categories=SEXES).codes
+        continent_codes, continents = pd.factorize(df["Continent"], sort=True)
+
+        # Medals of every (year, noc, sport, sex) counted at once from the position of each athlete row in the cube
+        shape = (len(years), len(nocs), len(sports), len(SEXES))
+        cells = np.ravel_multi_index((year_codes, noc_codes, sport_codes, sex_codes), shape)
+        medals = np.stack([np.bincount(cells, weights=df[medal].to_numpy(), minlength=np.prod(shape)).reshape(shape)
+                           for medal in MEDALS], axis=-1)
+        counts = np.zeros((len(years), len(nocs), len(sports) + 1, len(SEXES) + 1, len(MEDALS)))
+        counts[:, :, 1:, 1:] = medals
+        counts[:, :, 0, 1:] = medals.sum(axis=2)
+        counts[:, :, :, 0] = counts[:, :, :, 1:].sum(axis=3)
+        counts = counts.astype(np.min_scalar_type(int(counts.max())))
+
+        continent = np.full((len(years), len(nocs)), -1, dtype=np.int8)
+        continent[year_codes, noc_codes] = continent_codes
+        pib = np.full((len(years), len(nocs)), np.nan)
+        pib[year_codes, noc_codes] = df["PIB"].div(1e9).round(0).to_numpy()
+        return {
+            "counts": counts, "years": np.asarray(years, dtype=np.int16), "nocs": np.asarray(nocs, dtype=str),
+            "sports": np.asarray([ALL] + list(sports), dtype=str), "sexes": np.asarray([ALL] + SEXES, dtype=str),
+            "continents": np.asarray(continents, dtype=str), "continent": continent, "pib": pib
+        }
+
+    @staticmethod
+    def build_dataset(df=None):
+        # Reuse the shared base data when provided by the build pipeline
+        if df is None:
+            df = BaseDataset.load_shared_data()
+        arrays = MedalCubeDataset.aggregate(df)
+        # Written to a temporary file first so the dashboard never loads a half written cube
+        temp_path = MEDAL_CUBE_DATASET_PATH + ".tmp.npz"
+        np.savez_compressed(temp_path, **arrays)
+        os.replace(temp_path, MEDAL_CUBE_DATASET_PATH)
+        return MedalCube(arrays)
@@ -0,0 +1,272 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+
+# Dictionary containing medal data for the maps
+# Shared by the dashboard, the static export and the build of the pre-serialized map figures
+# For each medal type the fields are:
+# - name: the name to be shown on the dashboard
+# - type: internal name of the data
+# - group: how countries are grouped in the map (Continent or PIB)
+medal_maps = {
+    "gold-medal": {
+        "name": "GOLD MEDALS",
+        "type": "Gold",
+        "group": "Continent"
+    },
+    "silver-medal": {
+        "name": "SILVER MEDALS",
+        "type": "Silver",
+        "group": "Continent"
+    },
+    "bronze-medal": {
+        "name": "BRONZE MEDALS",
+        "type": "Bronze",
+        "group": "Continent"
+    },
+    "all-medals": {
+        "name": "TOTAL MEDALS",
+        "type": "Medals",
+        "group": "Continent"
+    },
+    "pib-gold-medal": {
+        "name": "GOLD MEDALS + PIB DATA",
+        "type": "Gold",
+        "group": "PIB"
+    },
+    "pib-silver-medal": {
+        "name": "SILVER MEDALS + PIB DATA",
+        "type": "Silver",
+        "group": "PIB"
+    },
+    "pib-bronze-medal": {
+        "name": "BRONZE MEDALS + PIB DATA",
+        "type": "Bronze",
+        "group": "PIB"
+    },
+    "pib-all-medals": {
+        "name": "TOTAL MEDALS + PIB DATA",
+        "type": "Medals",
+        "group": "PIB"
+    }
+}
+
+# Medal types counted in every map, as in the type field of medal_maps
+MEDAL_TYPES = ["Gold", "Silver", "Bronze", "Medals"]
+CONTINENT_COLORS = ["red", "orange", "yellow", "green", "blue", "purple"]
+PIB_COLORS = ["yellow", "green", "blue", "purple"]
+
+
+# Medal counts shared by all the maps, computed in a single pass over the medals dataset
+# - table: one row per Year, NOC, Team, Continent and PIB (in billion USD) with the counts of every medal type,
+#   sorted by year and country, and the PIB group of the row (-1 without PIB)
+# - continents: continents in the order they first appear, continent maps color them in this order
+# - pib_limits: (min, max) PIB of every PIB group, from the quartiles of all the PIBs
+# - tables: rows shown by every group type, continent maps add up the rows of a country with several PIBs in a year
+# - rows: positions in its table of the rows of every (year, continent) and (year, PIB group)
+# Every trace of a map figure takes its rows from these positions, no figure groups or filters the data again
+class MedalTable:
+    def __init__(self, medals_df):
+        pib = medals_df["PIB"].div(1e9).round(0)
+        keys = [medals_df["Year"], medals_df["NOC"], medals_df["Team"], medals_df["Continent"], pib]
+        self.table = medals_df[MEDAL_TYPES].groupby(keys, observed=True, dropna=False).sum().reset_index()
+        # Groups of categorical keys are not always sorted by groupby
+        self.table = self.table.sort_values(["Year", "NOC", "Team", "Continent", "PIB"], ignore_index=True)
+
+        pibs = self.table["PIB"].dropna().unique()
+        q3, q2, q1 = np.percentile(pibs, [75, 50, 25])
+        self.pib_limits = [(0, q1), (q1, q2), (q2, q3), (q3, max(pibs))]
+        # A PIB on the limit of two groups belongs to the lower one
+        upper_limits = [limit[1] for limit in self.pib_limits[:-1]]
+        pib_groups = np.searchsorted(upper_limits, self.table["PIB"], side="left")
+        self.table["PIB group"] = np.where(self.table["PIB"].isna(), -1, pib_groups).astype("int8")
+
+        continent_keys = ["Year", "NOC", "Team", "Continent"]
+        continent_table = self.table.groupby(continent_keys, observed=True)[MEDAL_TYPES].sum().reset_index()
+        self.tables = {
+            "Continent": continent_table.sort_values(continent_keys, ignore_index=True),
+            "PIB": self.table
+        }
+        self.continents = list(self.tables["Continent"]["Continent"].unique())
+        self.rows = {
+            "Continent": self.tables["Continent"].groupby(["Year", "Continent"], observed=True, sort=False).indices,
+            "PIB": self.table.groupby(["Year", "PIB group"], sort=False).indices
+        }
+        self.years = {
+            "Continent": self.tables["Continent"]["Year"].unique(),
+            "PIB": self.table.loc[self.table["PIB group"] >= 0, "Year"].unique()
+        }
+
+    # Rows of a group (continent or PIB group) in a year, empty if the group has no countries that year
+    def get_rows(self, group_type, year, group):
+        return self.tables[group_type].iloc[self.rows[group_type].get((year, group), [])]
+
+    # Years with a figure for a group type
+    def get_years(self, group_type):
+        return self.years[group_type]
+
+
+def build_medal_table(medals_df):
+    return MedalTable(medals_df)
+
+
+# Medal counts of the maps computed from other data than the medals dataset, one row per country
+# Same interface as MedalTable so the map figures are built by the same functions
+# Continents and PIB groups keep the colors and limits of the maps of the medals dataset
+# Subclasses implement get_slice(year), returning the countries shown in a year with their continents,
+# PIBs (in billion USD) and a (countries, 4) array of counts of every medal type
+class SlicedMedalTable:
+    def __init__(self, medal_table):
+        self.medal_table = medal_table
+        self.continents = medal_table.continents
+        self.pib_limits = medal_table.pib_limits
+        self.year_rows = {}
+
+    def get_year_rows(self, year):
+        if year not in self.year_rows:
+            nocs, continents, pibs, counts = self.get_slice(year)
+            rows = pd.DataFrame(counts, columns=MEDAL_TYPES)
+            rows.insert(0, "NOC", nocs)
+            upper_limits = [limit[1] for limit in self.pib_limits[:-1]]
+            pib_groups = np.where(np.isnan(pibs), -1, np.searchsorted(upper_limits, pibs, side="left"))
+            self.year_rows[year] = {"Continent": (rows, continents), "PIB": (rows, pib_groups)}
+        return self.year_rows[year]
+
+    def get_rows(self, group_type, year, group):
+        rows, groups = self.get_year_rows(year)[group_type]
+        return rows[groups == group]
+
+    def get_years(self, group_type):
+        return self.medal_table.get_years(group_type)
+
+
+# Medal counts of the maps filtered by sport and sex, taken from a slice of the medal cube
+class FilteredMedalTable(SlicedMedalTable):
+    def __init__(self, medal_table, medal_cube, sport, sex):
+        super().__init__(medal_table)
+        self.medal_cube = medal_cube
+        self.sport = sport
+        self.sex = sex
+
+    def get_slice(self, year):
+        if year not in self.medal_cube.year_index:
+            return np.array([], dtype=str), np.array([], dtype=str), np.array([]), np.zeros((0, len(MEDAL_TYPES)))
+        return self.medal_cube.get_slice(year, self.sport, self.sex)
+
+
+# Medal counts of the maps of a range of years, the "year" of the figures is a (first year, last year) tuple
+# Countries are grouped by their latest continent and by their mean PIB over the range
+class RangeMedalTable(SlicedMedalTable):
+    def __init__(self, medal_table, range_store):
+        super().__init__(medal_table)
+        self.range_store = range_store
+
+    def get_slice(self, year_range):
+        return self.range_store.get_totals(*year_range)
+
+
+# Continent maps color the countries by continent
+def build_medals_figure_continent(medal_table, medal_type, year):
+    fig = go.Figure()
+    for i, continent in enumerate(medal_table.continents):
+        df_sub = medal_table.get_rows("Continent", year, continent)
+        fig.add_trace(go.Scattergeo(
+            locations = df_sub['NOC'],
+            geo = "geo",
+            marker = dict(
+                size=df_sub[medal_type]**1.4,
+                color = CONTINENT_COLORS[i],
+                line_color='rgb(40,40,40)',
+                line_width=0.5,
+                sizemode = 'area'
+            ),
+            text=df_sub[medal_type],
+            legendgrouptitle = {"text": "Continent", "font": {"color": "#000000", "size": 16}},
+            name = continent,
+            hovertemplate="%{location}<br>%{text} medals",
+        ))
+    fig.update_layout(
+        geo = dict(
+            bgcolor="#292929",
+            landcolor="rgba(221, 217, 217, 1)"
+        ),
+        paper_bgcolor = "#292929",
+        legend = dict(
+            bgcolor = "rgba(221, 217, 217, 0.757)",
+            itemwidth=40,
+            itemsizing = 'constant',
+            font=dict(
+                family="Lexend",
+                color= "black",
+                size=14
+            )
+        ),
+        margin={"r": 0, "t": 25, "l": 0, "b":25}
+    )
+    return fig
+
+
+def build_medals_figures_continent(medals_df, medal_type):
+    return build_medals_figures(medals_df, medal_type, "Continent")
+
+
+# PIB maps color the countries by the quartile of their PIB (in billion USD) among all the PIBs in the data
+def build_medals_figure_pib(medal_table, medal_type, year):
+    fig = go.Figure()
+    for i, lim in enumerate(medal_table.pib_limits):
+        df_sub = medal_table.get_rows("PIB", year, i)
+        fig.add_trace(go.Scattergeo(
+            locations = df_sub['NOC'],
+            geo = "geo",
+            marker = dict(
+                size=df_sub[medal_type]**1.4,
+                color = PIB_COLORS[i],
+                line_color='rgb(40,40,40)',
+                line_width=0.5,
+                sizemode = 'area'
+            ),
+            text=df_sub[medal_type],
+            legendgrouptitle = {"text": "PIB in Billion USD", "font": {"color": "#000000", "size": 16}},
+            name = '{0} - {1}'.format(lim[0],lim[1]),
+            hovertemplate="%{location}<br>%{text} medals"
+        ))
+    fig.update_layout(
+        geo = go.layout.Geo(
+            bgcolor="#292929",
+            landcolor="rgba(221, 217, 217, 1)"
+        ),
+        paper_bgcolor = "#292929",
+        legend = dict(
+            bgcolor = "rgba(221, 217, 217, 0.757)",
+            itemwidth=40,
+            itemsizing = 'constant',
+            font=dict(
+                family="Lexend",
+                color= "black",
+                size=14
+            )
+        ),
+        margin={"r": 0, "t": 25, "l": 0, "b":25}
+    )
+    return fig
+
+
+def build_medals_figures_pib(medals_df, medal_type):
+    return build_medals_figures(medals_df, medal_type, "PIB")
+
+# Builder of the figure of a single year for each group type
+group_types = {
+    "Continent": build_medals_figure_continent,
+    "PIB": build_medals_figure_pib
+}
+
+# Build the figure of a single year of a map from the medal table
+def build_medals_figure(medal_table, medal_type, group_type, year):
+    return group_types[group_type](medal_table, medal_type, year)
+
+# Build the dictionary of yearly medals for a medal type
+def build_medals_figures(medals_df, medal_type, group_type):
+    medal_table = build_medal_table(medals_df)
+    return {year: build_medals_figure(medal_table, medal_type, group_type, year)
+            for year in medal_table.get_years(group_type)}
@@ -1,9 +1,15 @@
 import pandas as pd
 
-from dataset_generators.medals_dataset import MedalsDataset
+from dataset_generators.medals_dataset import MedalsDataset, MEDALS_DATASET_PATH
+from dataset_generators.dataset_cache import load_dataset, save_dataset, get_res_path
+from dataset_generators.schema import apply_schema, CATEGORY, SMALL_INT
 
 MEDALS_COUNTRY_DATASET_NAME = "MEDALS"
-MEDALS_COUNTRY_DATASET_PATH = r".\res\medals_country_dataset.csv"
+MEDALS_COUNTRY_DATASET_PATH = get_res_path("medals_country_dataset.csv")
+# Column types applied when the dataset is loaded
+MEDALS_COUNTRY_DATASET_SCHEMA = {
+    "Year": SMALL_INT, "NOC": CATEGORY, "Gold": SMALL_INT, "Silver": SMALL_INT, "Bronze": SMALL_INT
+}
 
 class MedalsCountryDataset:
     @staticmethod
@@ -11,12 +17,33 @@ class MedalsCountryDataset:
         return MEDALS_COUNTRY_DATASET_NAME
 
     @staticmethod
-    def load_data():
-        return pd.read_csv(MEDALS_COUNTRY_DATASET_PATH, encoding="latin1")
+    def get_inputs():
+        return [MEDALS_DATASET_PATH]
 
     @staticmethod
-    def build_dataset():
-        df = MedalsDataset.load_data()
+    def get_outputs():
+        return [MEDALS_COUNTRY_DATASET_PATH]
+
+    @staticmethod
+    def get_schema():
+        return MEDALS_COUNTRY_DATASET_SCHEMA
+
+    @staticmethod
+    def load_data(engine=None):
+        return apply_schema(load_dataset(MEDALS_COUNTRY_DATASET_PATH, engine), MEDALS_COUNTRY_DATASET_SCHEMA)
+
+    # Rows of the dataset for the given medals data, without saving them
+    @staticmethod
+    def aggregate(df):
         group_keys = ["Year", "NOC", "Gold", "Silver", "Bronze"]
-        medals_df = df[group_keys].groupby(group_keys[:2]).sum().reset_index()
-        medals_df.to_csv(MEDALS_COUNTRY_DATASET_PATH, index=False)
\ No newline at end of file
+        # Sorted explicitly, grouping categorical columns with observed=True keeps the order of appearance instead
+        return df[group_keys].groupby(group_keys[:2], observed=True).sum().sort_index().reset_index()
+
+    @staticmethod
+    def build_dataset(df=None):
+        # Reuse the medals data when provided by the build pipeline
+        if df is None:
+            df = MedalsDataset.load_data()
+        medals_df = MedalsCountryDataset.aggregate(df)
+        save_dataset(medals_df, MEDALS_COUNTRY_DATASET_PATH)
+        return medals_df
\ No newline at end of file
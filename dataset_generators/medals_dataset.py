@@ -1,9 +1,16 @@
 import pandas as pd
 
-from dataset_generators.base_dataset import BaseDataset
+from dataset_generators.base_dataset import BaseDataset, BASE_DATASET_PATH
+from dataset_generators.dataset_cache import load_dataset, save_dataset, get_res_path
+from dataset_generators.schema import apply_schema, CATEGORY, SMALL_INT
 
 MEDALS_DATASET_NAME = "MEDALS"
-MEDALS_DATASET_PATH = r".\res\medals_dataset.csv"
+MEDALS_DATASET_PATH = get_res_path("medals_dataset.csv")
+# Column types applied when the dataset is loaded
+MEDALS_DATASET_SCHEMA = {
+    "Year": SMALL_INT, "NOC": CATEGORY, "Team": CATEGORY, "Continent": CATEGORY, "Sport": CATEGORY,
+    "Gold": SMALL_INT, "Silver": SMALL_INT, "Bronze": SMALL_INT, "Medals": SMALL_INT
+}
 
 class MedalsDataset:
     @staticmethod
@@ -11,16 +18,31 @@ class MedalsDataset:
         return MEDALS_DATASET_NAME
 
     @staticmethod
-    def load_data():
-        return pd.read_csv(MEDALS_DATASET_PATH, encoding="latin1")
+    def get_inputs():
+        return [BASE_DATASET_PATH]
 
     @staticmethod
-    def build_dataset():
-        df = BaseDataset.load_data()
-        # Add a column containing with a binary value for the medals won
-        df["Gold"] = df["Medal"].apply(lambda row: 1 if row == "Gold" else 0)       # Won a gold medal
-        df["Silver"] = df["Medal"].apply(lambda row: 1 if row == "Silver" else 0)   # Won a silver medal
-        df["Bronze"] = df["Medal"].apply(lambda row: 1 if row == "Bronze" else 0)   # Won a bronze medal
-        df["Medals"] = df["Gold"] + df["Silver"] + df["Bronze"]                     # Won any medal
-        medals_df = df[["Year", "NOC", "Team", "Continent", "Sport", "Gold", "Silver", "Bronze", "Medals", "PIB"]]
-        medals_df.to_csv(MEDALS_DATASET_PATH, index=False)
\ No newline at end of file
+    def get_outputs():
+        return [MEDALS_DATASET_PATH]
+
+    @staticmethod
+    def get_schema():
+        return MEDALS_DATASET_SCHEMA
+
+    @staticmethod
+    def load_data(engine=None):
+        return apply_schema(load_dataset(MEDALS_DATASET_PATH, engine), MEDALS_DATASET_SCHEMA)
+
+    # Rows of the dataset for the given shared base data, without saving them
+    @staticmethod
+    def aggregate(df):
+        # The shared base data already contains a binary column for each medal won
+        return df[["Year", "NOC", "Team", "Continent", "Sport", "Gold", "Silver", "Bronze", "Medals", "PIB"]]
+
+    @staticmethod
+    def build_dataset(df=None):
+        if df is None:
+            df = BaseDataset.load_shared_data()
+        medals_df = MedalsDataset.aggregate(df)
+        save_dataset(medals_df, MEDALS_DATASET_PATH)
+        return medals_df
\ No newline at end of file
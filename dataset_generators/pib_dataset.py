@@ -1,10 +1,14 @@
 import pandas as pd
 import numpy as np
 
-from dataset_generators.base_dataset import BaseDataset
+from dataset_generators.base_dataset import BaseDataset, BASE_DATASET_PATH
+from dataset_generators.dataset_cache import load_dataset, save_dataset, get_res_path
+from dataset_generators.schema import apply_schema, CATEGORY, SMALL_INT
 
 PIB_DATASET_NAME = "PIB/MEDALS PER YEAR"
-PIB_DATASET_PATH = r".\res\pib_dataset.csv"
+PIB_DATASET_PATH = get_res_path("pib_dataset.csv")
+# Column types applied when the dataset is loaded
+PIB_DATASET_SCHEMA = {"Year": SMALL_INT, "NOC": CATEGORY, "Continent": CATEGORY, "Medals": SMALL_INT}
 
 class PIBDataset:
     @staticmethod
@@ -12,19 +16,36 @@ class PIBDataset:
         return PIB_DATASET_NAME
 
     @staticmethod
-    def load_data():
-        return pd.read_csv(PIB_DATASET_PATH, encoding="latin1")
+    def get_inputs():
+        return [BASE_DATASET_PATH]
 
     @staticmethod
-    def build_dataset():
-        df = BaseDataset.load_data()
-        df["Gold"] = df["Medal"].apply(lambda row: 1 if row == "Gold" else 0)       # Won a gold medal
-        df["Silver"] = df["Medal"].apply(lambda row: 1 if row == "Silver" else 0)   # Won a silver medal
-        df["Bronze"] = df["Medal"].apply(lambda row: 1 if row == "Bronze" else 0)   # Won a bronze medal
-        df["Medals"] = df["Gold"] + df["Silver"] + df["Bronze"]                     # Won any medal
+    def get_outputs():
+        return [PIB_DATASET_PATH]
+
+    @staticmethod
+    def get_schema():
+        return PIB_DATASET_SCHEMA
+
+    @staticmethod
+    def load_data(engine=None):
+        return apply_schema(load_dataset(PIB_DATASET_PATH, engine), PIB_DATASET_SCHEMA)
+
+    # Rows of the dataset for the given shared base data, without saving them
+    @staticmethod
+    def aggregate(df):
+        # The shared base data already contains the medal columns
         group_keys = ["Year", "NOC", "Continent", "PIB"]
         pib_df = df[["Year", "NOC", "Continent", "Medals", "PIB"]].groupby(group_keys).sum().reset_index()
         pib_df["PIB/MEDALS"] = pib_df['PIB'].div(pib_df['Medals']).replace(np.inf, 0)
-        pib_df.to_csv(PIB_DATASET_PATH, index=False)
+        return pib_df
+
+    @staticmethod
+    def build_dataset(df=None):
+        if df is None:
+            df = BaseDataset.load_shared_data()
+        pib_df = PIBDataset.aggregate(df)
+        save_dataset(pib_df, PIB_DATASET_PATH)
+        return pib_df
        
     
\ No newline at end of file
@@ -0,0 +1,56 @@
+import pandas as pd
+
+from dataset_generators.dataset_cache import load_dataset
+
+# Column types of the datasets loaded by the dashboard, applied by their load_data()
+# - CATEGORY: codes and names repeated in many rows, stored once per distinct value
+# - SMALL_INT: integers stored in the smallest integer type that fits all the values (int8, int16, ...)
+# - FLOAT32: decimals (or counts with missing values) that don't need more than 7 significant digits
+# PIB columns keep float64: their values need more digits and they are shown in the graphs and used to group the maps
+CATEGORY = "category"
+SMALL_INT = "small int"
+FLOAT32 = "float32"
+
+
+def apply_schema(df, schema):
+    for column, dtype in schema.items():
+        if column not in df.columns:
+            continue
+        if dtype == SMALL_INT:
+            df[column] = pd.to_numeric(df[column], downcast="integer")
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+# Memory used by a dataset in bytes, including the strings of object columns
+def get_memory_usage(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+# Memory used by every dataset as read from disk and with its schema applied
+def get_memory_report(datasets):
+    report = []
+    for dataset in datasets:
+        df = load_dataset(dataset.get_outputs()[0])
+        before = get_memory_usage(df)
+        after = get_memory_usage(apply_schema(df, dataset.get_schema()))
+        report.append((dataset.get_name(), before, after))
+    return report
+
+
+def print_memory_report(report):
+    print(f"{'Dataset':<24}{'Before (KB)':>14}{'After (KB)':>14}{'Ratio':>8}")
+    for name, before, after in report + [("Total", sum(r[1] for r in report), sum(r[2] for r in report))]:
+        print(f"{name:<24}{before / 1024:>14.0f}{after / 1024:>14.0f}{before / max(after, 1):>7.1f}x")
+
+
+if __name__ == "__main__":
+    from dataset_generators.medals_dataset import MedalsDataset
+    from dataset_generators.medals_country_dataset import MedalsCountryDataset
+    from dataset_generators.gender_dataset import GenderDataset
+    from dataset_generators.top_5_sports_dataset import Top5SportsDataset
+    from dataset_generators.pib_dataset import PIBDataset
+
+    print_memory_report(get_memory_report([MedalsDataset, MedalsCountryDataset, GenderDataset,
+                                           Top5SportsDataset, PIBDataset]))
@@ -1,9 +1,20 @@
 import pandas as pd
 
-from dataset_generators.medals_dataset import MedalsDataset
+from dataset_generators.medals_dataset import MedalsDataset, MEDALS_DATASET_PATH
+from dataset_generators.dataset_cache import load_dataset, save_dataset, get_res_path
+from dataset_generators.schema import apply_schema, CATEGORY, SMALL_INT, FLOAT32
 
 TOP_5_SPORTS_DATASET_NAME = "TOP 5 SPORTS"
-TOP_5_SPORTS_DATASET_PATH = r".\res\top_5_sports_dataset.csv"
+TOP_5_SPORTS_DATASET_PATH = get_res_path("top_5_sports_dataset.csv")
+# Number of sports kept per country and year
+TOP_SPORTS = 5
+# Column types applied when the dataset is loaded
+# Positions after the first can be empty, so their medals are stored as float32 (NaN when empty)
+TOP_5_SPORTS_DATASET_SCHEMA = {
+    "Year": SMALL_INT, "NOC": CATEGORY, "Medals 1": SMALL_INT,
+    **{f"Sport {position}": CATEGORY for position in range(1, TOP_SPORTS + 1)},
+    **{f"Medals {position}": FLOAT32 for position in range(2, TOP_SPORTS + 1)}
+}
 
 class Top5SportsDataset:
     @staticmethod
@@ -11,38 +22,53 @@ class Top5SportsDataset:
         return TOP_5_SPORTS_DATASET_NAME
 
     @staticmethod
-    def load_data():
-        return pd.read_csv(TOP_5_SPORTS_DATASET_PATH, encoding="latin1")
+    def get_inputs():
+        return [MEDALS_DATASET_PATH]
 
     @staticmethod
-    def build_dataset():
-        df = MedalsDataset.load_data()
-        df_top = df[["Year", "NOC", "Sport", "Medals"]].groupby(["Year", "NOC", "Sport"]).sum().reset_index()
-        years = df_top["Year"].unique()
+    def get_outputs():
+        return [TOP_5_SPORTS_DATASET_PATH]
+
+    @staticmethod
+    def get_schema():
+        return TOP_5_SPORTS_DATASET_SCHEMA
+
+    @staticmethod
+    def load_data(engine=None):
+        return apply_schema(load_dataset(TOP_5_SPORTS_DATASET_PATH, engine), TOP_5_SPORTS_DATASET_SCHEMA)
+
+    # Rows of the dataset for the given medals data, without saving them
+    @staticmethod
+    def aggregate(df):
+        # Sorted explicitly, grouping categorical columns with observed=True keeps the order of appearance instead
+        df_top = df[["Year", "NOC", "Sport", "Medals"]].groupby(["Year", "NOC", "Sport"], observed=True).sum()
+        df_top = df_top.sort_index().reset_index()
+        # Countries are listed in the order they first appear in the medals data
         countries = df_top["NOC"].unique()
-        cols = ["Year", "NOC", "Sport 1", "Medals 1", "Sport 2", "Medals 2", "Sport 3", 
-            "Medals 3", "Sport 4", "Medals 4", "Sport 5", "Medals 5"]
-        output_df = pd.DataFrame([], columns=cols)
-        for year in years:
-            for country in countries:
-                try:
-                    aux = df_top.loc[(df_top["Year"]==year) & (df_top["NOC"]==country)].nlargest(5, "Medals")
-                except:
-                    continue
-                if aux["Medals"].sum() == 0:
-                    continue
-                data = [year, country]
-                for i in range(5):
-                    try:
-                        med = aux.iloc[i, 3]
-                        if med != 0:
-                            data.append(aux.iloc[i, 2])
-                            data.append(med)
-                        else:
-                            data.append("")
-                            data.append("")
-                    except:
-                        data.append("")
-                        data.append("")
-                output_df = pd.concat([output_df, pd.DataFrame([data], columns=cols)], ignore_index=True)
-        output_df.to_csv(TOP_5_SPORTS_DATASET_PATH, index=False)
\ No newline at end of file
+        country_order = pd.Series(range(len(countries)), index=countries)
+        # Rank the sports with medals of each country and year, ties are ordered alphabetically by sport
+        # The sport is part of the sort so the order doesn't depend on the column types (e.g. loaded with the schema)
+        ranked = df_top[df_top["Medals"] > 0].sort_values(["Year", "NOC", "Medals", "Sport"],
+                                                          ascending=[True, True, False, True])
+        ranked["Position"] = ranked.groupby(["Year", "NOC"], observed=True).cumcount() + 1
+        ranked = ranked[ranked["Position"] <= TOP_SPORTS]
+        # Pivot the top sports into the wide Sport N / Medals N layout, leaving missing positions empty
+        positions = range(1, TOP_SPORTS + 1)
+        top_df = ranked.pivot(index=["Year", "NOC"], columns="Position", values=["Sport", "Medals"])
+        top_df = top_df.reindex(columns=pd.MultiIndex.from_product([["Sport", "Medals"], positions]))
+        output_df = top_df.index.to_frame(index=False)
+        for position in positions:
+            output_df[f"Sport {position}"] = top_df["Sport", position].values
+            output_df[f"Medals {position}"] = pd.array(top_df["Medals", position].values, dtype="Int64")
+        # Mapping a categorical column gives a categorical, whose sort would follow the NOCs instead of the order
+        output_df["Order"] = output_df["NOC"].map(country_order).astype(int)
+        return output_df.sort_values(["Year", "Order"]).drop(columns="Order").reset_index(drop=True)
+
+    @staticmethod
+    def build_dataset(df=None):
+        # Reuse the medals data when provided by the build pipeline
+        if df is None:
+            df = MedalsDataset.load_data()
+        output_df = Top5SportsDataset.aggregate(df)
+        save_dataset(output_df, TOP_5_SPORTS_DATASET_PATH)
+        return output_df
\ No newline at end of file
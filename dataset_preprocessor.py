@@ -1,17 +1,24 @@
+import argparse
 import csv
-import awoc
-import pycountry
+import json
+import os
+import sys
+from collections import Counter, namedtuple
+
+import pandas as pd
+
+from dataset_generators.dataset_cache import fingerprint, get_res_path
 
 # Relative paths for CSVs
-PIB = r".\res\API_NY.GDP.MKTP.CD_DS2_en_csv_v2_4683825.csv"
-ATHLETES = r".\res\athlete_events.csv"
-ATHLETES_WITH_PIB = r".\res\athlete_events_with_pib.csv"
+PIB = get_res_path("API_NY.GDP.MKTP.CD_DS2_en_csv_v2_4683825.csv")
+ATHLETES = get_res_path("athlete_events.csv")
+ATHLETES_WITH_PIB = get_res_path("athlete_events_with_pib.csv")
+COUNTRY_INDEX = get_res_path("country_index.csv")
 
 # Column index in the PIB CSV
 PIB_C = 0
 PIB_CC = 1
 PIB_PIBS_START = 4
-PIB_PIBS_END = 66
 
 # Column index in the athletes CSV
 ATHLETES_C = 6
@@ -23,6 +30,18 @@ ATHLETES_CONTINENT = 16
 # Year in which the PIB data starts
 BASE_YEAR = 1960
 
+# Number of athlete rows written to the final CSV at once
+CHUNK_SIZE = 10000
+
+# Ways of enriching the athletes with their PIB and continent:
+# - rows: row by row with dictionary lookups (reference implementation)
+# - table: vectorized lookups over a long PIB table and a country mapping table, chunk by chunk
+ENGINES = ["rows", "table"]
+
+# Progress counters of the rows read, written and dropped, along with the reasons for dropping them
+PROGRESS = Counter()
+DROPPED = Counter()
+
 # Dictionary for country codes in the PIB CSV that need to be replaced for the athletes CSV
 COUNTRY_CODES_REPLACE = {
     "BAH": "BHS", "BER": "BMU", "BRU": "BRN", "CAM": "KHM", "CGO": "COG", "DEN": "DNK", "GAM": "GMB", "GBS": "GNB",
@@ -36,122 +55,371 @@ COUNTRY_CODES_NO_EXIST = ["URS", "FRG", "GDR", "MAL", "YUG", "TCH", "IOA", "SCG"
 
 
 # Creates a dictionary with countries as keys and their continent as the value
-# Data pulled from the a-world-of-countries library
+# Data pulled from the a-world-of-countries library, only imported when a country has to be resolved
 CONTINENTS = {}
 def load_continents():
+    if CONTINENTS:
+        return
+    import awoc
     world = awoc.AWOC()
     for world_country in world.get_countries():
         CONTINENTS[world_country["ISO3"]] = world_country["Continent Name"]
 
 
+# Proper country data of an athlete: name, alpha_3 (the 3 letter country code "standard") and continent
+ProperCountry = namedtuple("ProperCountry", ["name", "alpha_3", "continent"])
+
 # Determines the proper country data using:
 # - The country name provided in the athletes CSV
 # - The country code provided in the PIB CSV
 # - The country code provided in the athletes CSV
-# Data pulled from the pycountries library
+# Data pulled from the pycountries library, only imported when a country has to be resolved
+# Returns None if no proper country exists
+def resolve_country(athletes_c, pib_cc, athletes_cc):
+    import pycountry
+    # Repeatedly try to get the proper country until it succeeds
+    proper = pycountry.countries.get(alpha_3=pib_cc)
+    if not proper:
+        proper = pycountry.countries.get(alpha_3=athletes_cc)
+    if not proper:
+        proper = pycountry.countries.get(common_name=athletes_c)
+    if not proper:
+        proper = pycountry.countries.get(name=athletes_c)
+    if not proper:
+        PROGRESS["fuzzy searches"] += 1
+        try:
+            proper = pycountry.countries.search_fuzzy(athletes_c)[0]
+        except LookupError:
+            return None
+    load_continents()
+    return ProperCountry(proper.name, proper.alpha_3, CONTINENTS.get(proper.alpha_3, None))
+
 
-# Stores the proper country data of a PIB country code
+# Stores the proper country data of every (athletes country, PIB country code, athletes country code)
+# None is stored for combinations without a proper country, so they are not resolved again either
+# Filled from the country index, which is built by build_country_index once per PIB CSV
 COUNTRY_CACHE = {}
 def get_proper_country(athletes_c, pib_cc, athletes_cc):
-    # Get country from cache, returning an empty string if it not cached
-    proper = COUNTRY_CACHE.get(pib_cc, "")
+    key = (athletes_c, pib_cc, athletes_cc)
+    if key not in COUNTRY_CACHE:
+        # Combination missing from the country index, it is added to the index at the end of the run
+        PROGRESS["country index misses"] += 1
+        COUNTRY_CACHE[key] = resolve_country(athletes_c, pib_cc, athletes_cc)
+    return COUNTRY_CACHE[key]
 
-    # Repeatedly try to get the proper country until it succeeds
-    if proper and proper != "":
-        return proper
-    elif proper != "":
-        proper = pycountry.countries.get(alpha_3=pib_cc)
-        if not proper:
-            proper = pycountry.countries.get(alpha_3=athletes_cc)
-        if not proper:
-            proper = pycountry.countries.get(common_name=athletes_c)
-        if not proper:
-            proper = pycountry.countries.get(name=athletes_c)
-        if not proper:
-            print("Fuzzy on:", athletes_c)
-            proper = pycountry.countries.search_fuzzy(athletes_c)[0]
-            if proper:
-                print("          Found", proper.name)
 
-        COUNTRY_CACHE[pib_cc] = proper
-        return proper
+# Resolves every country combination of the athletes CSV that has PIB data and saves them to the country index
+# Uses the same rules as the preprocessing: first country of multi national teams and COUNTRY_CODES_REPLACE,
+# countries that no longer exist are only resolved if their name has PIB data
+def build_country_index(athletes_path=ATHLETES, pib_path=PIB, index_path=COUNTRY_INDEX):
+    pibs_c, pibs_cc = load_pibs(pib_path)
+    COUNTRY_CACHE.clear()
+    with open(athletes_path) as athletes_file:
+        athletes_reader = csv.reader(athletes_file, delimiter=",")
+        next(athletes_reader)
+        for row in athletes_reader:
+            country = row[ATHLETES_C].split("/")[0]
+            country_code = COUNTRY_CODES_REPLACE.get(row[ATHLETES_CC], row[ATHLETES_CC])
+            key = (country, country_code, row[ATHLETES_CC])
+            if key in COUNTRY_CACHE or int(row[ATHLETES_YEAR]) < BASE_YEAR:
+                continue
+            if country in pibs_c or country_code in pibs_cc:
+                COUNTRY_CACHE[key] = resolve_country(*key)
+    save_country_index(index_path, pib_path)
 
 
-if __name__ == "__main__":
-    # Obtain country PIBs and store together with the country and country code
+# The country index is a CSV with one row per country combination
+# Name, Alpha 3 and Continent are left empty when the combination has no proper country (or continent)
+COUNTRY_INDEX_HEADERS = ["Country", "PIB Code", "Code", "Name", "Alpha 3", "Continent"]
+
+# The fingerprint of the PIB CSV the country index was built with is stored next to it, in a JSON file
+# The index is built again when the PIB CSV changes, since it only holds the countries with PIB data
+# Athletes CSVs share the index, countries missing from it are resolved and added at the end of the run
+def get_country_index_fingerprint_path(index_path):
+    return os.path.splitext(index_path)[0] + ".json"
+
+
+def is_country_index_fresh(index_path, pib_path):
+    fingerprint_path = get_country_index_fingerprint_path(index_path)
+    if not os.path.exists(index_path) or not os.path.exists(fingerprint_path):
+        return False
+    with open(fingerprint_path) as fingerprint_file:
+        return json.load(fingerprint_file).get("pib") == fingerprint(pib_path)
+
+
+def save_country_index(index_path=COUNTRY_INDEX, pib_path=PIB):
+    with open(index_path, "w", newline="", encoding="utf-8") as index_file:
+        index_writer = csv.writer(index_file, delimiter=",")
+        index_writer.writerow(COUNTRY_INDEX_HEADERS)
+        for key, proper in COUNTRY_CACHE.items():
+            index_writer.writerow(list(key) + ([proper.name, proper.alpha_3, proper.continent or ""] if proper else ["", "", ""]))
+    with open(get_country_index_fingerprint_path(index_path), "w") as fingerprint_file:
+        json.dump({"pib": fingerprint(pib_path)}, fingerprint_file)
+
+
+def load_country_index(index_path=COUNTRY_INDEX):
+    COUNTRY_CACHE.clear()
+    with open(index_path, newline="", encoding="utf-8") as index_file:
+        index_reader = csv.reader(index_file, delimiter=",")
+        next(index_reader)
+        for athletes_c, pib_cc, athletes_cc, name, alpha_3, continent in index_reader:
+            COUNTRY_CACHE[(athletes_c, pib_cc, athletes_cc)] = ProperCountry(name, alpha_3, continent or None) if alpha_3 else None
+
+
+# Column indexes of the PIBs per year in the PIB CSV, from PIB_PIBS_START up to the last year in the headers
+# Every new edition of the PIB CSV adds a year column, and its lines end with a comma (an empty last column)
+def get_pib_year_columns(headers):
+    return range(PIB_PIBS_START, max(i for i, header in enumerate(headers) if header.isdigit()) + 1)
+
+
+# Reads the PIB CSV, returning the PIBs per year of every country indexed by country and by country code
+# Both dictionaries share the same PIBs per year object for a country
+def load_pibs(path=PIB):
     pibs_c = {}
     pibs_cc = {}
-    with open(PIB) as pib_file:
+    with open(path) as pib_file:
         pib_reader = csv.reader(pib_file, delimiter=",")
-        counter = 0
-        headers = []
+        headers = next(pib_reader)
+        year_columns = get_pib_year_columns(headers)
         for row in pib_reader:
-            # Load headers from row 0
-            if counter == 0:
-                headers = row
-            # Load data from all other rows
-            else:
-                country = row[PIB_C]
-                country_code = row[PIB_CC]
-                # Use the same dictionary object for both country and country codes dictionaries
-                pibs_per_year = {}
-                pibs_c[country] = pibs_per_year
-                pibs_cc[country_code] = pibs_per_year
-                # Load all PIBs for a country
-                for pib_year in range(PIB_PIBS_START, PIB_PIBS_END):
-                    pibs_per_year[headers[pib_year]] = row[pib_year]
-            counter += 1
-
-    # Generate all final athlete data
-    athletes_with_pib = []
-    load_continents()
-    with open(ATHLETES) as athletes_file:
+            pibs_per_year = {headers[pib_year]: row[pib_year] for pib_year in year_columns}
+            pibs_c[row[PIB_C]] = pibs_per_year
+            pibs_cc[row[PIB_CC]] = pibs_per_year
+    return pibs_c, pibs_cc
+
+
+# Yields the athlete rows of the athletes CSV one by one, without the headers row
+def read_athletes(athletes_reader):
+    for row in athletes_reader:
+        PROGRESS["read"] += 1
+        yield row
+
+
+# Yields the athlete rows from years after the BASE_YEAR
+def filter_athletes(rows):
+    for row in rows:
+        if int(row[ATHLETES_YEAR]) < BASE_YEAR:
+            drop("before base year")
+            continue
+        yield row
+
+
+# Yields the athlete rows with their PIB and continent set and their country data made proper
+# Athletes without all the proper data are dropped
+def enrich_athletes(rows, pibs_c, pibs_cc):
+    for row in rows:
+        year = row[ATHLETES_YEAR]
+        # If multi national, take only the first country
+        country = row[ATHLETES_C].split("/")[0]
+        # Get the PIB country code from the athletes country code
+        country_code = COUNTRY_CODES_REPLACE.get(row[ATHLETES_CC], row[ATHLETES_CC])
+        apib_c = pibs_c.get(country, None)
+        apib_cc = pibs_cc.get(country_code, None)
+        pib = apib_c if apib_c else apib_cc
+        if not pib:
+            # Countries that no longer exist have no PIB data, any other country is missing from the PIB CSV
+            drop("country no longer exists" if country_code in COUNTRY_CODES_NO_EXIST else "rogue country code")
+            continue
+        # Years missing from the PIB CSV (e.g. editions newer than it) have an empty PIB, like years without data
+        row[ATHLETES_PIB] = pib.get(year, "")
+        # Set the proper country data for the athlete
+        c = get_proper_country(country, country_code, row[ATHLETES_CC])
+        if not c:
+            drop("non ISO 3166 country")
+            continue
+        row[ATHLETES_C] = c.name
+        row[ATHLETES_CC] = c.alpha_3
+        # Only add the country to the final CSV if it has all the proper data
+        if not c.continent:
+            drop("missing continent")
+            continue
+        row[ATHLETES_CONTINENT] = c.continent
+        yield row
+
+
+# Writes the rows to the CSV writer in chunks of chunk_size rows, so only one chunk is held in memory
+def write_athletes(apib_writer, rows, chunk_size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            write_chunk(apib_writer, chunk)
+            chunk = []
+    if chunk:
+        write_chunk(apib_writer, chunk)
+
+
+def write_chunk(apib_writer, chunk, size=None):
+    apib_writer.writerows(chunk)
+    PROGRESS["written"] += size if size is not None else len(chunk)
+    print(f"[INFO] Rows read: {PROGRESS['read']}, written: {PROGRESS['written']}, dropped: {PROGRESS['dropped']}")
+
+
+def drop(reason, count=1):
+    if count:
+        PROGRESS["dropped"] += count
+        DROPPED[reason] += count
+
+
+# Reshapes the PIB CSV from one column per year into a long table with the columns:
+# Country, Country Code, Year and PIB (empty when the PIB of a year is missing)
+# The file is read the same way as in load_pibs so both engines see the same country names
+# PIBs are kept as the text of the PIB CSV, parsing them as floats would not always write back the same digits
+def load_pib_table(path=PIB):
+    with open(path) as pib_file:
+        pib_df = pd.read_csv(pib_file, dtype=str, keep_default_na=False)
+    pib_df = pib_df.rename(columns={pib_df.columns[PIB_C]: "Country", pib_df.columns[PIB_CC]: "Country Code"})
+    year_columns = pib_df.columns[get_pib_year_columns(pib_df.columns)]
+    pib_df = pib_df.melt(id_vars=["Country", "Country Code"], value_vars=list(year_columns),
+                         var_name="Year", value_name="PIB")
+    return pib_df
+
+
+# Indexes the PIBs of the long PIB table by (country, year) and by (country code, year)
+# Repeated countries and codes keep their last row in the PIB CSV, as in load_pibs
+def index_pib_table(pib_df):
+    pibs_c = pib_df.drop_duplicates(["Country", "Year"], keep="last").set_index(["Country", "Year"])["PIB"]
+    pibs_cc = pib_df.drop_duplicates(["Country Code", "Year"], keep="last").set_index(["Country Code", "Year"])["PIB"]
+    return pibs_c, pibs_cc
+
+
+# PIB of every athlete, looked up by country name first and by country code otherwise
+# Years missing from the PIB CSV have an empty PIB, as in enrich_athletes
+def lookup_pibs(pibs_c, pibs_cc, country, country_code, year):
+    found_c = country.isin(pibs_c.index.levels[0])
+    found_cc = country_code.isin(pibs_cc.index.levels[0])
+    pib = pibs_cc.reindex(pd.MultiIndex.from_arrays([country_code, year])).to_numpy()
+    pib_c = pibs_c.reindex(pd.MultiIndex.from_arrays([country, year])).to_numpy()
+    pib[found_c.to_numpy()] = pib_c[found_c.to_numpy()]
+    return pd.Series(pib, index=country.index).fillna(""), found_c | found_cc
+
+
+# Mapping table from (athletes country, PIB country code, athletes country code) to the proper country
+# Columns: Name, Code (alpha_3) and Continent, with empty rows for countries without a proper country
+COUNTRY_TABLE = pd.DataFrame(columns=["Name", "Code", "Continent"],
+                             index=pd.MultiIndex.from_arrays([[], [], []], names=["Country", "PIB Code", "Code"]))
+
+# Adds the countries that are not in the mapping table yet and returns their proper data
+def lookup_countries(country, country_code, athletes_cc):
+    global COUNTRY_TABLE
+    keys = pd.MultiIndex.from_arrays([country, country_code, athletes_cc], names=COUNTRY_TABLE.index.names)
+    new_keys = keys[~keys.isin(COUNTRY_TABLE.index)].unique()
+    if len(new_keys) > 0:
+        new_rows = []
+        for athletes_c, pib_cc, a_cc in new_keys:
+            c = get_proper_country(athletes_c, pib_cc, a_cc)
+            new_rows.append(list(c) if c else [None, None, None])
+        new_table = pd.DataFrame(new_rows, columns=COUNTRY_TABLE.columns, index=new_keys)
+        COUNTRY_TABLE = pd.concat([COUNTRY_TABLE, new_table]) if len(COUNTRY_TABLE) else new_table
+    resolved = COUNTRY_TABLE.reindex(keys)
+    resolved.index = country.index
+    return resolved
+
+
+# Enriches the athletes chunk by chunk with vectorized operations, dropping the same athletes as enrich_athletes
+# Columns are indexed by position, like in the rows engine
+def enrich_athletes_table(athletes_file, apib_writer, pib_df, column_count, chunk_size):
+    pibs_c, pibs_cc = index_pib_table(pib_df)
+    chunks = pd.read_csv(athletes_file, header=None, names=range(column_count), dtype=str,
+                         keep_default_na=False, chunksize=chunk_size)
+    for chunk in chunks:
+        PROGRESS["read"] += len(chunk)
+        # Only keep data from years after the BASE_YEAR
+        after_base_year = chunk[ATHLETES_YEAR].astype(int) >= BASE_YEAR
+        drop("before base year", int((~after_base_year).sum()))
+        chunk = chunk[after_base_year]
+
+        # If multi national, take only the first country (split once per distinct team)
+        teams, team_names = pd.factorize(chunk[ATHLETES_C])
+        country = pd.Series(team_names.str.split("/").str[0].to_numpy()[teams], index=chunk.index)
+        # Get the PIB country code from the athletes country code
+        country_code = chunk[ATHLETES_CC].replace(COUNTRY_CODES_REPLACE)
+        pib, found = lookup_pibs(pibs_c, pibs_cc, country, country_code, chunk[ATHLETES_YEAR])
+        no_exist = country_code.isin(COUNTRY_CODES_NO_EXIST)
+        drop("country no longer exists", int((~found & no_exist).sum()))
+        drop("rogue country code", int((~found & ~no_exist).sum()))
+        chunk, country, country_code, pib = chunk[found], country[found], country_code[found], pib[found]
+
+        # Set the proper country data for the athletes
+        proper = lookup_countries(country, country_code, chunk[ATHLETES_CC])
+        iso = proper["Code"].notna()
+        drop("non ISO 3166 country", int((~iso).sum()))
+        has_continent = iso & proper["Continent"].notna()
+        drop("missing continent", int((iso & ~has_continent).sum()))
+        chunk = chunk[has_continent].copy()
+        chunk[ATHLETES_C] = proper["Name"][has_continent]
+        chunk[ATHLETES_CC] = proper["Code"][has_continent]
+        chunk[ATHLETES_PIB] = pib[has_continent]
+        chunk[ATHLETES_CONTINENT] = proper["Continent"][has_continent]
+        if len(chunk):
+            write_chunk(apib_writer, chunk.itertuples(index=False, name=None), len(chunk))
+
+
+# Streams the athletes CSV through the whole pipeline (read, filter, enrich and write)
+# Memory use does not depend on the size of the athletes CSV
+def preprocess(athletes_path=ATHLETES, pib_path=PIB, output_path=ATHLETES_WITH_PIB, chunk_size=CHUNK_SIZE,
+               engine="table", index_path=COUNTRY_INDEX):
+    PROGRESS.clear()
+    DROPPED.clear()
+    # Countries are resolved once into the country index, later runs with the same PIB CSV only read it
+    if not is_country_index_fresh(index_path, pib_path):
+        print("[INFO] Building country index")
+        build_country_index(athletes_path, pib_path, index_path)
+    load_country_index(index_path)
+    with open(athletes_path) as athletes_file, open(output_path, "w", newline="") as apib_file:
         athletes_reader = csv.reader(athletes_file, delimiter=",")
-        counter = 0
-        for row in athletes_reader:
-            # Load headers from row 0
-            if counter == 0:
-                headers = row
-                athletes_with_pib.append(row)
-            # Load data from all other rows
-            else:
-                year = row[ATHLETES_YEAR]
-                # Only add data from years after the BASE_YEAR
-                if int(year) < BASE_YEAR:
-                    continue
-                # If multi national, take only the first country
-                country = row[ATHLETES_C].split("/")[0]
-                # Get the PIB country code from the athletes country code
-                country_code = COUNTRY_CODES_REPLACE.get(row[ATHLETES_CC], row[ATHLETES_CC])
-                apib_c = pibs_c.get(country, None)
-                apib_cc = pibs_cc.get(country_code, None)
-                pib = apib_c if apib_c else apib_cc
-                # If PIB data was found
-                if pib:
-                    row[ATHLETES_PIB] = pib[year]
-                    # Set the proper country data for the athlete
-                    c = get_proper_country(country, country_code, row[ATHLETES_CC])
-                    if c:
-                        # alpha_3 is the 3 letter country code "standard"
-                        row[ATHLETES_C] = c.name
-                        row[ATHLETES_CC] = c.alpha_3
-                        continent = CONTINENTS.get(c.alpha_3, None)
-                        # Only add the country to the final CSV if it has all the proper data
-                        if continent:
-                            row[ATHLETES_CONTINENT] = continent
-                            athletes_with_pib.append(row)
-                        else:
-                            print("Missing continent for:", c.name)
-                    # Proper country not found
-                    else:
-                        print("Non ISO 3166:", country_code, row[ATHLETES_CC], country)
-                else:
-                    # If the country still exists but no PIB was found
-                    if country_code not in COUNTRY_CODES_NO_EXIST:
-                        print("Rogue country code:", country_code, country)
-            counter += 1
-
-    # Write out final CSV
-    with open(ATHLETES_WITH_PIB, 'w', newline="") as apib_file:
         apib_writer = csv.writer(apib_file, delimiter=",")
-        apib_writer.writerows(athletes_with_pib)
+        headers = next(athletes_reader)
+        apib_writer.writerow(headers)
+        if engine == "rows":
+            pibs_c, pibs_cc = load_pibs(pib_path)
+            rows = read_athletes(athletes_reader)
+            rows = filter_athletes(rows)
+            rows = enrich_athletes(rows, pibs_c, pibs_cc)
+            write_athletes(apib_writer, rows, chunk_size)
+        else:
+            enrich_athletes_table(athletes_file, apib_writer, load_pib_table(pib_path), len(headers), chunk_size)
+    if PROGRESS["country index misses"]:
+        save_country_index(index_path, pib_path)
+
+
+# Runs both engines and checks that they write the exact same CSV
+def verify_engines(athletes_path=ATHLETES, pib_path=PIB, output_path=ATHLETES_WITH_PIB, chunk_size=CHUNK_SIZE,
+                   index_path=COUNTRY_INDEX):
+    outputs = {}
+    for engine in ENGINES:
+        engine_path = f"{output_path}.{engine}"
+        preprocess(athletes_path, pib_path, engine_path, chunk_size, engine, index_path)
+        with open(engine_path, "rb") as engine_file:
+            outputs[engine] = engine_file.read()
+        os.remove(engine_path)
+    return outputs["rows"] == outputs["table"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Adds the PIB and continent of every athlete to the athletes CSV")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="number of rows written at once")
+    parser.add_argument("--engine", choices=ENGINES, default="table", help="how athletes are enriched (default: table)")
+    parser.add_argument("--verify", action="store_true", help="check that both engines write the same CSV")
+    parser.add_argument("--build-country-index", action="store_true",
+                        help="resolve all the countries again instead of using the saved country index")
+    parser.add_argument("--country-index", default=COUNTRY_INDEX,
+                        help=f"country index used and updated by the run (default: {COUNTRY_INDEX})")
+    args = parser.parse_args()
+    if args.build_country_index:
+        print("[INFO] Building country index")
+        build_country_index(index_path=args.country_index)
+    if args.verify:
+        if not verify_engines(chunk_size=args.chunk_size, index_path=args.country_index):
+            print("[ERROR] The rows and table engines wrote different CSVs")
+            sys.exit(1)
+        print("[SUCCESS] The rows and table engines wrote the same CSV")
+    preprocess(chunk_size=args.chunk_size, engine=args.engine, index_path=args.country_index)
+
+    print(f"[SUCCESS] Rows read: {PROGRESS['read']}, written: {PROGRESS['written']}, dropped: {PROGRESS['dropped']}")
+    for reason, count in DROPPED.most_common():
+        print(f"          Dropped ({reason}): {count}")
+    if PROGRESS["country index misses"]:
+        print(f"          Countries missing from the country index: {PROGRESS['country index misses']}")
+    if PROGRESS["fuzzy searches"]:
+        print(f"          Countries found by fuzzy search: {PROGRESS['fuzzy searches']}")
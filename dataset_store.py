@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+
+# Indexes a dataset by (Year, NOC), storing the values of the given columns for every key
+# Missing values are stored as None whatever the type of their column
+def index_by_year_noc(df, columns):
+    keys = zip(df["Year"].tolist(), df["NOC"].tolist())
+    values = df[columns].astype(object)
+    return dict(zip(keys, values.where(values.notna(), None).values.tolist()))
+
+
+# Indexes a dataset by NOC, storing the slice of rows of every country
+def index_by_noc(df):
+    return {noc: noc_df for noc, noc_df in df.groupby("NOC", sort=False, observed=True)}
+
+
+# Loaded datasets indexed for the per country panels
+# Every lookup is a dictionary access instead of a scan of the whole dataset
+# Lookups return None when there is no data for the country (and year)
+class DatasetStore:
+    def __init__(self, gender_df, top5_df, medals_c_df, pib_df):
+        self.gender = index_by_year_noc(gender_df, ["Women", "Men"])
+        self.top5 = index_by_year_noc(top5_df, list(top5_df.columns[2:]))
+        self.medals_country = index_by_year_noc(medals_c_df, ["Gold", "Silver", "Bronze"])
+        self.pib = index_by_noc(pib_df)
+
+    # Participants per gender: [Women, Men]
+    def get_gender(self, year, noc):
+        return self.gender.get((year, noc))
+
+    # Top 5 sports: [Sport 1, Medals 1, ..., Sport 5, Medals 5]
+    def get_top5(self, year, noc):
+        return self.top5.get((year, noc))
+
+    # Medals won: [Gold, Silver, Bronze]
+    def get_medals_country(self, year, noc):
+        return self.medals_country.get((year, noc))
+
+    # PIB and medals time series of a country, one row per year
+    def get_pib(self, noc):
+        return self.pib.get(noc)
+
+
+# Sums of the given columns of a dataset per country, accumulated over the years
+# sums[k, n] adds up the rows of nocs[n] in the years before years[k], missing values count as 0
+def get_cumulative_sums(df, columns, years, nocs):
+    year_positions = np.searchsorted(years, df["Year"].to_numpy())
+    noc_positions = pd.Categorical(df["NOC"].astype(str), categories=nocs).codes
+    values = df[columns].to_numpy(dtype=float)
+    sums = np.zeros((len(years) + 1, len(nocs), len(columns)))
+    np.add.at(sums, (year_positions + 1, noc_positions), np.nan_to_num(values))
+    return sums.cumsum(axis=0)
+
+
+# Totals of every country over any range of years, for the year range mode of the map and the per country panels
+# The medals, participants and PIBs of every country are accumulated once over the years, so the totals of a range
+# are the difference of two rows: one lookup per country whatever the length of the range
+class RangeStore:
+    def __init__(self, gender_df, medals_c_df, pib_df):
+        self.years = np.array(sorted({int(year) for df in [gender_df, medals_c_df, pib_df] for year in df["Year"]}))
+        self.nocs = np.array(sorted({str(noc) for df in [gender_df, medals_c_df, pib_df] for noc in df["NOC"]}))
+        self.noc_index = {noc: i for i, noc in enumerate(self.nocs)}
+        medals_c_df = medals_c_df.assign(Editions=1)
+        self.medals = get_cumulative_sums(medals_c_df, ["Gold", "Silver", "Bronze", "Editions"], self.years, self.nocs)
+        self.gender = get_cumulative_sums(gender_df, ["Women", "Men"], self.years, self.nocs)
+        pib_df = pib_df.assign(PIBs=pib_df["PIB"].notna().astype(int))
+        self.pib = get_cumulative_sums(pib_df, ["PIB", "PIBs"], self.years, self.nocs)
+        # Latest continent of every country
+        continents = pib_df.sort_values("Year").drop_duplicates("NOC", keep="last")
+        self.continents = pd.Series(continents["Continent"].astype(str).to_numpy(),
+                                    index=continents["NOC"].astype(str)).reindex(self.nocs).to_numpy()
+
+    # Rows of the cumulative sums to subtract for the years from first_year to last_year (both included)
+    def get_bounds(self, first_year, last_year):
+        return (np.searchsorted(self.years, first_year, side="left"),
+                np.searchsorted(self.years, last_year, side="right"))
+
+    # Medals won in the range: [Gold, Silver, Bronze], None if the country did not take part in any year of it
+    def get_medals_country(self, first_year, last_year, noc):
+        if noc not in self.noc_index:
+            return None
+        start, end = self.get_bounds(first_year, last_year)
+        medals = self.medals[end, self.noc_index[noc]] - self.medals[start, self.noc_index[noc]]
+        return [int(value) for value in medals[:3]] if medals[3] else None
+
+    # Participants per gender in the range: [Women, Men]
+    def get_gender(self, first_year, last_year, noc):
+        if noc not in self.noc_index:
+            return None
+        start, end = self.get_bounds(first_year, last_year)
+        gender = self.gender[end, self.noc_index[noc]] - self.gender[start, self.noc_index[noc]]
+        return [int(value) for value in gender] if gender.any() else None
+
+    # Countries that took part in the range, with their continent, mean PIB (in billion USD, NaN without PIB)
+    # and a (countries, 4) array of their Gold, Silver, Bronze and total medals
+    def get_totals(self, first_year, last_year):
+        start, end = self.get_bounds(first_year, last_year)
+        medals = self.medals[end] - self.medals[start]
+        pib = self.pib[end] - self.pib[start]
+        present = medals[:, 3] > 0
+        counts = medals[present, :3].astype(np.int64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            pibs = np.where(pib[present, 1] > 0, pib[present, 0] / pib[present, 1] / 1e9, np.nan).round(0)
+        return (self.nocs[present], self.continents[present], pibs,
+                np.column_stack([counts, counts.sum(axis=1)]))
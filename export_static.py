@@ -0,0 +1,148 @@
+import argparse
+import json
+import os
+import shutil
+import string
+from concurrent.futures import ProcessPoolExecutor
+
+import plotly
+
+import main
+from dataset_generators.pib_dataset import PIBDataset
+from dataset_generators.gender_dataset import GenderDataset
+from dataset_generators.top_5_sports_dataset import Top5SportsDataset
+from dataset_generators.medals_country_dataset import MedalsCountryDataset
+from dataset_generators.medal_maps import medal_maps
+from figure_encoding import get_figure_defaults, encode_figure, figure_to_dict
+from utils import empty_graph
+
+# Exports the dashboard as a static site, served by any file server or CDN without running Python:
+# - index.html and app.js (static_export/) show the same map, buttons, slider and per country graphs
+# - every map figure of every year and the per country graphs of every country are rendered once, in the compact
+#   encoding of figure_encoding.py, as JSON shards the page fetches when they are first shown
+# The sport and gender filters, the year range mode and the hot reload need the server and are not exported
+STATIC_EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static_export")
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+PLOTLY_JS_PATH = os.path.join(os.path.dirname(plotly.__file__), "package_data", "plotly.min.js")
+DEFAULT_OUTPUT = "static_site"
+# Countries whose graphs of the latest year are used to find the properties shared by all the per country graphs
+PANEL_DEFAULTS_COUNTRIES = 10
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as json_file:
+        json.dump(data, json_file, separators=(",", ":"))
+    return os.path.getsize(path)
+
+
+# Graphs without data (empty_graph) only have a layout
+# The PIB graph is None when the country has no PIB that year, the page shows the empty graph instead
+def get_panel_dicts(gen, year, noc):
+    return [{"data": [], **figure_to_dict(panel)} if panel is not None else None
+            for panel in main.build_panels(gen, year, noc)]
+
+
+# Years with per country graphs of every country: the years it took part in
+def get_country_years(gen):
+    country_years = {}
+    for year, noc in gen.store.gender:
+        country_years.setdefault(noc, []).append(year)
+    return {noc: sorted(years) for noc, years in country_years.items()}
+
+
+def export_figures(gen, data_dir, figure_defaults):
+    size = 0
+    count = 0
+    for map_name in medal_maps:
+        for year in main.get_map_years(gen, map_name):
+            figure = figure_to_dict(main.load_map_figure(gen, map_name, year))
+            path = os.path.join(data_dir, "figures", map_name, f"{int(year)}.json")
+            size += write_json(path, encode_figure(figure, figure_defaults))
+            count += 1
+    return count, size
+
+
+# Run by the worker processes, which inherit the datasets when they are forked
+def init_export_worker():
+    if main.generation is None:
+        main.load_datasets()
+
+
+# All the years of a country in one shard, so clicking a country is a single request
+def export_country_panels(noc, years, data_dir, panel_defaults):
+    panels = {}
+    for year in years:
+        panels[int(year)] = [encode_figure(panel, panel_defaults) if panel is not None else None
+                             for panel in get_panel_dicts(main.generation, year, noc)]
+    return write_json(os.path.join(data_dir, "panels", f"{noc}.json"), panels)
+
+
+def export_panels(gen, data_dir, panel_defaults, jobs):
+    country_years = get_country_years(gen)
+    args = [(noc, years, data_dir, panel_defaults) for noc, years in country_years.items()]
+    if jobs == 1:
+        sizes = [export_country_panels(*arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=init_export_worker) as executor:
+            sizes = list(executor.map(export_country_panels, *zip(*args), chunksize=8))
+    return len(country_years), sum(sizes)
+
+
+def export_page(output_dir):
+    with open(os.path.join(STATIC_EXPORT_DIR, "index.html")) as template_file:
+        page = string.Template(template_file.read()).substitute(
+            pib_title=PIBDataset.get_name(), gender_title=GenderDataset.get_name(),
+            top5_title=Top5SportsDataset.get_name(), medals_country_title=MedalsCountryDataset.get_name())
+    with open(os.path.join(output_dir, "index.html"), "w") as page_file:
+        page_file.write(page)
+    shutil.copy(os.path.join(STATIC_EXPORT_DIR, "app.js"), output_dir)
+    for asset in ["style.css", "favicon.ico", "clientside.js"]:
+        shutil.copy(os.path.join(ASSETS_DIR, asset), output_dir)
+    shutil.copy(PLOTLY_JS_PATH, output_dir)
+
+
+def export_static(output_dir=DEFAULT_OUTPUT, jobs=None):
+    jobs = jobs or os.cpu_count()
+    main.load_datasets()
+    gen = main.generation
+    data_dir = os.path.join(output_dir, "data")
+    # Shards of previous exports could belong to maps or countries no longer in the datasets
+    if os.path.isdir(data_dir):
+        shutil.rmtree(data_dir)
+    os.makedirs(data_dir)
+
+    latest_year = gen.years[-1]
+    figure_defaults = get_figure_defaults([figure_to_dict(main.load_map_figure(gen, map_name, latest_year))
+                                          for map_name in main.FIGURE_DEFAULTS_MAPS])
+    countries = [noc for year, noc in gen.store.gender if year == latest_year][:PANEL_DEFAULTS_COUNTRIES]
+    # Empty graphs don't have the template and styling of the rest
+    panels = [panel for noc in countries for panel in get_panel_dicts(gen, latest_year, noc)]
+    panel_defaults = get_figure_defaults([panel for panel in panels if panel and panel["data"]])
+
+    print(f"[INFO] Exporting the map figures to '{output_dir}'")
+    figures, figures_size = export_figures(gen, data_dir, figure_defaults)
+    print(f"[INFO] Exporting the per country graphs with {jobs} workers")
+    panels, panels_size = export_panels(gen, data_dir, panel_defaults, jobs)
+    write_json(os.path.join(data_dir, "manifest.json"), {
+        "years": gen.years,
+        "maps": {map_name: {"name": medal_map["name"],
+                            "years": [int(year) for year in main.get_map_years(gen, map_name)]}
+                 for map_name, medal_map in medal_maps.items()},
+        "initial": {"map": "gold-medal", "pib": True, "year": latest_year, "noc": main.DEFAULT_COUNTRY},
+        "figure_defaults": figure_defaults,
+        "panel_defaults": panel_defaults,
+        "empty_panel": empty_graph("Not matching data found.")
+    })
+    export_page(output_dir)
+    print(f"[SUCCESS] Exported {figures} map figures ({figures_size / 2 ** 20:.1f} MB) and the graphs of "
+          f"{panels} countries ({panels_size / 2 ** 20:.1f} MB) to '{output_dir}'")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exports the dashboard as a static site")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT, help=f"output folder (default: {DEFAULT_OUTPUT})")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="number of processes rendering the per country graphs (default: number of CPUs)")
+    args = parser.parse_args()
+    export_static(args.output, args.jobs)
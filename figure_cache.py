@@ -0,0 +1,44 @@
+import threading
+from collections import OrderedDict
+
+
+# Least recently used cache holding at most maxsize entries
+# Values are built the first time their key is requested, and the least recently used entry is dropped when full
+# Safe to use from the threads of the server, a value may be built twice if requested at the same time
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+        # Built outside the lock so other keys can be served in the meantime
+        value = build()
+        self.set(key, value)
+        return value
+
+    # Stores a value built elsewhere (e.g. by the background warm-up)
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
@@ -0,0 +1,82 @@
+import base64
+import json
+
+import numpy as np
+
+# Compact encoding of the map figures, decoded in the browser by olympicsdash.decode_figure (assets/clientside.js)
+# - The layout and trace properties shared by all the figures (template, styling, ...) are sent once, as defaults
+# - Numeric lists are packed as typed arrays: {"dtype": "f4" or "i4", "bdata": base64 of the little endian values}
+# - Lists of strings are joined: {"strings": "ABW,AGO,...", "sep": ","}
+PACK_MIN_LENGTH = 8
+STRING_SEPARATOR = ","
+
+# Marks a property missing from some of the values in get_common
+MISSING = object()
+
+
+# Properties with the same value in all the given values
+def get_common(values):
+    if all(isinstance(value, dict) for value in values):
+        common = {}
+        for key in set.intersection(*(set(value.keys()) for value in values)):
+            key_common = get_common([value[key] for value in values])
+            if key_common is not MISSING:
+                common[key] = key_common
+        return common
+    if any(value != values[0] for value in values[1:]):
+        return MISSING
+    return values[0]
+
+
+# Layout and trace properties shared by the given figures
+def get_figure_defaults(figures):
+    return {
+        "layout": get_common([figure["layout"] for figure in figures]),
+        "trace": get_common([trace for figure in figures for trace in figure["data"]])
+    }
+
+
+def pack_list(values):
+    if len(values) < PACK_MIN_LENGTH:
+        return values
+    if all(isinstance(value, str) for value in values):
+        if any(STRING_SEPARATOR in value for value in values):
+            return values
+        return {"strings": STRING_SEPARATOR.join(values), "sep": STRING_SEPARATOR}
+    if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+        array = np.asarray(values, dtype=np.float64)
+        if np.all(array == np.round(array)) and np.all(np.abs(array) < 2 ** 31):
+            packed, dtype = array.astype("<i4"), "i4"
+        else:
+            packed, dtype = array.astype("<f4"), "f4"
+        return {"dtype": dtype, "bdata": base64.b64encode(packed.tobytes()).decode("ascii")}
+    return values
+
+
+# Removes the properties equal to their default and packs the lists
+# Defaults missing from the value are set to None so they are not added back by the decoder
+def compact_value(value, default=None):
+    if isinstance(value, dict):
+        default = default if isinstance(default, dict) else {}
+        compact = {key: None for key in default if key not in value}
+        for key, key_value in value.items():
+            if key in default and key_value == default[key]:
+                continue
+            compact[key] = compact_value(key_value, default.get(key))
+        return compact
+    if isinstance(value, list):
+        return pack_list([compact_value(item) for item in value])
+    return value
+
+
+# Figures are either plain dictionaries (pre-serialized figures) or plotly figures
+def figure_to_dict(figure):
+    return figure if isinstance(figure, dict) else json.loads(figure.to_json())
+
+
+# Compact encoding of a figure (as a dictionary) against the defaults from get_figure_defaults
+def encode_figure(figure, defaults):
+    return {
+        "layout": compact_value(figure["layout"], defaults["layout"]),
+        "data": [compact_value(trace, defaults["trace"]) for trace in figure["data"]]
+    }
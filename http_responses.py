@@ -0,0 +1,63 @@
+import gzip
+
+from flask import Response, request
+
+# Brotli is optional, responses are compressed with gzip without it
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Responses smaller than this are sent uncompressed, compressing them doesn't pay off
+COMPRESSION_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+COMPRESSED_MIMETYPES = ["application/json", "application/javascript", "text/javascript", "text/html", "text/css"]
+# Only the responses built for every request are compressed: callbacks and map figures
+# Static files (the Dash and plotly.js bundles) are left as they are, compressing them again on every page load
+# costs more CPU than it saves, a reverse proxy or CDN can compress and cache them once
+COMPRESSED_PATHS = ["/_dash-update-component", "/figures/"]
+
+
+# Best encoding accepted by the browser: brotli, gzip or None
+def get_encoding(accept_encoding):
+    encodings = [encoding.split(";")[0].strip() for encoding in accept_encoding.split(",")]
+    if brotli and "br" in encodings:
+        return "br"
+    if "gzip" in encodings:
+        return "gzip"
+    return None
+
+
+# Compresses the responses of the callbacks and map figures when the browser accepts it
+# Files sent from disk (direct passthrough) and not modified responses are left as they are
+def compress_response(response):
+    if (response.direct_passthrough or response.status_code != 200 or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSED_MIMETYPES
+            or not any(request.path.startswith(path) for path in COMPRESSED_PATHS)):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = get_encoding(request.headers.get("Accept-Encoding", ""))
+    data = response.get_data()
+    if encoding is None or len(data) < COMPRESSION_MIN_SIZE:
+        return response
+    if encoding == "br":
+        response.set_data(brotli.compress(data))
+    else:
+        response.set_data(gzip.compress(data, GZIP_LEVEL))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def enable_compression(server):
+    server.after_request(compress_response)
+
+
+# JSON response with an ETag, answered with 304 Not Modified when the browser already has the same body
+# Browsers revalidate it on every use (no-cache), so a changed payload is never served from their cache
+# The ETag is weak: it is computed on the uncompressed body and shared by its gzip, brotli and identity encodings
+def make_cacheable_response(body):
+    response = Response(body, mimetype="application/json")
+    response.vary.add("Accept-Encoding")
+    response.add_etag(weak=True)
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
@@ -0,0 +1,148 @@
+import argparse
+import os
+import sys
+import tempfile
+
+import dataset_preprocessor
+from build_datasets import DATASETS, load_manifest, save_manifest, is_up_to_date
+from dataset_generators.base_dataset import BaseDataset, BASE_DATASET_PATH
+from dataset_generators.medals_dataset import MedalsDataset
+from dataset_generators.medals_country_dataset import MedalsCountryDataset
+from dataset_generators.gender_dataset import GenderDataset, GENRE_DATASET_PATH
+from dataset_generators.top_5_sports_dataset import Top5SportsDataset
+from dataset_generators.pib_dataset import PIBDataset
+from dataset_generators.dataset_cache import load_dataset, read_csv, append_dataset, remove_artifact, fingerprint
+
+# Adds a new Olympics edition to the datasets without rebuilding them:
+# - The athlete rows of the edition (a CSV shaped like athlete_events.csv) are enriched with their PIB and continent
+#   by dataset_preprocessor.py, using the PIB CSV and the country index
+# - The rows of the edition are appended to the athletes CSV, the base dataset and every dataset built from them
+# Rows of the years already in the datasets are never parsed, aggregated or written again, so that work depends on
+# the size of the edition. Only editions after the latest year in the datasets can be ingested
+# The one exception is the manifest of build_datasets.py: its SHA256 fingerprints cover whole files, so the inputs
+# and outputs of the datasets are hashed once before and once after the append. It is a sequential read of the
+# files, far cheaper than parsing them, but it still grows with the history
+# When the country index belongs to another PIB CSV, the edition is enriched with a temporary index of its own
+# countries, the shared index (and its fingerprint) is left for the next full run of dataset_preprocessor.py
+# The map figures depend on all the years (PIB quartiles) and the medal cube is a dense array over all of them,
+# they are rebuilt by the next run of build_datasets.py
+
+# Datasets built from the shared base data and from the medals data, appended in this order
+BASE_DATASETS = [MedalsDataset, GenderDataset, PIBDataset]
+MEDALS_DATASETS = [MedalsCountryDataset, Top5SportsDataset]
+
+
+class IngestError(Exception):
+    pass
+
+
+# Years of the athlete rows of an edition CSV
+def get_edition_years(athletes_path):
+    return sorted(int(year) for year in read_csv(athletes_path)["Year"].unique())
+
+
+# The latest year in the datasets, read from the gender dataset (one row per country and year)
+def get_latest_year():
+    return int(load_dataset(GENRE_DATASET_PATH)["Year"].max())
+
+
+def check_edition(edition_years, latest_year):
+    if not edition_years:
+        raise IngestError("The edition CSV has no athlete rows")
+    existing = [year for year in edition_years if year <= latest_year]
+    if existing:
+        raise IngestError(f"Years {existing} are not after the latest year in the datasets ({latest_year}), "
+                          f"rebuild the datasets with dataset_preprocessor.py and build_datasets.py instead")
+
+
+# Appends the lines of a CSV, without its headers row, to another CSV
+def append_lines(source_path, target_path):
+    with open(target_path, "rb+") as target_file:
+        target_file.seek(0, os.SEEK_END)
+        if target_file.tell():
+            target_file.seek(-1, os.SEEK_END)
+            if target_file.read(1) != b"\n":
+                target_file.write(b"\n")
+        with open(source_path, "rb") as source_file:
+            next(source_file)
+            for line in source_file:
+                target_file.write(line)
+
+
+# Datasets that were up to date before the ingestion, their manifest entries are updated after it
+# Every file is hashed once, even when it is the input of several datasets
+def get_up_to_date_datasets(manifest):
+    fingerprints = {}
+    up_to_date = []
+    for dataset in DATASETS:
+        for path in dataset.get_inputs():
+            if path not in fingerprints:
+                fingerprints[path] = fingerprint(path)
+        if is_up_to_date(dataset, manifest, fingerprints):
+            up_to_date.append(dataset)
+    return up_to_date
+
+
+def update_manifest(manifest, datasets):
+    fingerprints = {}
+    for dataset in datasets:
+        for path in dataset.get_inputs() + dataset.get_outputs():
+            if path not in fingerprints:
+                fingerprints[path] = fingerprint(path)
+        manifest[dataset.__name__] = {
+            "inputs": {path: fingerprints[path] for path in dataset.get_inputs()},
+            "outputs": {path: fingerprints[path] for path in dataset.get_outputs()}
+        }
+    save_manifest(manifest)
+
+
+def ingest_edition(athletes_path, pib_path=dataset_preprocessor.PIB, raw_athletes_path=dataset_preprocessor.ATHLETES,
+                   index_path=dataset_preprocessor.COUNTRY_INDEX):
+    edition_years = get_edition_years(athletes_path)
+    check_edition(edition_years, get_latest_year())
+    manifest = load_manifest()
+    up_to_date = [dataset for dataset in get_up_to_date_datasets(manifest)
+                  if dataset in BASE_DATASETS + MEDALS_DATASETS]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        enriched_path = os.path.join(temp_dir, "edition_with_pib.csv")
+        # Building the shared index from the edition alone would drop every historical country from it
+        if not dataset_preprocessor.is_country_index_fresh(index_path, pib_path):
+            index_path = os.path.join(temp_dir, os.path.basename(index_path))
+        print(f"[INFO] Enriching the athletes of {edition_years}")
+        dataset_preprocessor.preprocess(athletes_path, pib_path, enriched_path, index_path=index_path)
+        base_df = BaseDataset.add_indicators(read_csv(enriched_path))
+        if base_df.empty:
+            raise IngestError("No athlete of the edition has PIB and continent data")
+
+        # Every dataset is computed before any file is written
+        rows = {dataset: dataset.aggregate(base_df) for dataset in BASE_DATASETS}
+        rows.update({dataset: dataset.aggregate(rows[MedalsDataset]) for dataset in MEDALS_DATASETS})
+
+        print(f"[INFO] Appending {len(base_df)} athletes")
+        append_lines(athletes_path, raw_athletes_path)
+        append_lines(enriched_path, BASE_DATASET_PATH)
+        remove_artifact(BASE_DATASET_PATH)
+    for dataset in BASE_DATASETS + MEDALS_DATASETS:
+        print(f"[INFO] Appending {len(rows[dataset])} rows to dataset '{dataset.get_name()}'")
+        append_dataset(rows[dataset], dataset.get_outputs()[0])
+    # Datasets that were outdated before are left outdated, so build_datasets.py still rebuilds them
+    update_manifest(manifest, up_to_date)
+    return edition_years
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Appends a new Olympics edition to the datasets")
+    parser.add_argument("athletes", help="CSV with the athlete rows of the edition, shaped like athlete_events.csv")
+    parser.add_argument("--pib", default=dataset_preprocessor.PIB,
+                        help="PIB CSV with the PIBs of the edition year (default: the one in the datasets folder)")
+    parser.add_argument("--country-index", default=dataset_preprocessor.COUNTRY_INDEX,
+                        help="country index used to enrich the edition, a temporary one is built if it belongs to "
+                             f"another PIB CSV (default: {dataset_preprocessor.COUNTRY_INDEX})")
+    args = parser.parse_args()
+    try:
+        years = ingest_edition(args.athletes, args.pib, index_path=args.country_index)
+    except IngestError as error:
+        print(f"[ERROR] {error}")
+        sys.exit(1)
+    print(f"[SUCCESS] Edition {years} ingested, run build_datasets.py to rebuild the map figures and the medal cube")
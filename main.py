@@ -1,95 +1,436 @@
-from dash import Dash, html, dcc
-from dash.dependencies import Input, Output, State
+import gc
+import json
+import os
+import threading
+import time
+
+from dash import Dash, html, dcc, get_relative_path
+from dash.dependencies import Input, Output, State, ClientsideFunction
+from dash.exceptions import PreventUpdate
+from flask import abort
+from plotly.utils import PlotlyJSONEncoder
 
 from dataset_generators.medals_dataset import MedalsDataset
 from dataset_generators.medals_country_dataset import MedalsCountryDataset
 from dataset_generators.gender_dataset import GenderDataset
 from dataset_generators.top_5_sports_dataset import Top5SportsDataset
 from dataset_generators.pib_dataset import PIBDataset
+from dataset_generators.top_5_sports_dataset import TOP_SPORTS
+from dataset_generators.map_figures_dataset import MapFiguresDataset
+from dataset_generators.medal_cube_dataset import MedalCubeDataset, ALL
+from dataset_generators.medal_maps import medal_maps, group_types, build_medal_table, build_medals_figure, \
+    FilteredMedalTable, RangeMedalTable
+from dataset_store import DatasetStore, RangeStore
+from figure_cache import LRUCache
+from figure_encoding import get_figure_defaults, encode_figure, figure_to_dict
+from http_responses import enable_compression, make_cacheable_response
+from metrics import METRICS_ENABLED, timed, register_cache, enable_metrics
+from request_throttle import Prefetcher
+from warmup import Warmup, enable_health_checks
 from utils import *
 
+# The map figure builders of dataset_generators are timed when they are registered in the server,
+# so the package (also used by build_datasets.py and export_static.py) does not depend on the server metrics
+build_medal_table = timed("figure_build_seconds")(build_medal_table)
+for group_type, builder in group_types.items():
+    group_types[group_type] = timed("figure_build_seconds")(builder)
+
 # external_stylesheets = [
 #     './styles/style.css'
 # ]
 # external_stylesheets=external_stylesheets
 
-app = Dash(__name__ )
-medals_c_df = MedalsCountryDataset.load_data()
-medals_df = MedalsDataset.load_data()
-gender_df = GenderDataset.load_data()
-top5_df = Top5SportsDataset.load_data()
-pib_df = PIBDataset.load_data()
-
-# Dictionary containing medal data for the maps
-# The medal data is loaded on creation but figures are created separately in order to reuse the loaded data
-# For each medal type the fields are:
-# - name: the name to be shown on the dashboard
-# - type: internal name of the data
-# - data: the data from the medal type
-# - figures: yearly representations of the medal data (set in init_figures())
-medal_maps = {
-    "gold-medal": {
-        "name": "GOLD MEDALS",
-        "type": "Gold",
-        "group": "Continent",
-        "figures": None
-    },
-    "silver-medal": {
-        "name": "SILVER MEDALS",
-        "type": "Silver",
-        "group": "Continent",
-        "figures": None
-    },
-    "bronze-medal": {
-        "name": "BRONZE MEDALS",
-        "type": "Bronze",
-        "group": "Continent",
-        "figures": None
-    },
-    "all-medals": {
-        "name": "TOTAL MEDALS",
-        "type": "Medals",
-        "group": "Continent",
-        "figures": None
-    },
-    "pib-gold-medal": {
-        "name": "GOLD MEDALS + PIB DATA",
-        "type": "Gold",
-        "group": "PIB",
-        "figures": None
-    },
-    "pib-silver-medal": {
-        "name": "SILVER MEDALS + PIB DATA",
-        "type": "Silver",
-        "group": "PIB",
-        "figures": None
-    },
-    "pib-bronze-medal": {
-        "name": "BRONZE MEDALS + PIB DATA",
-        "type": "Bronze",
-        "group": "PIB",
-        "figures": None
-    },
-    "pib-all-medals": {
-        "name": "TOTAL MEDALS + PIB DATA",
-        "type": "Medals",
-        "group": "PIB",
-        "figures": None
-    }
+# Generation of the datasets served by the dashboard, loaded by load_datasets() when the app is created
+generation = None
+
+# Maximum number of map figures (map and year) kept in memory, the least recently used figures are dropped
+FIGURE_CACHE_SIZE = int(os.environ.get("OLYMPICSDASH_FIGURE_CACHE_SIZE", 32))
+# Maps whose figure of the default year is built before the server starts, the rest are built on their first request
+FIGURE_WARMUP = ["pib-gold-medal"]
+
+# Client side maps mode: the yearly figures of the selected medal type (with and without PIB data) are sent
+# once to the browser, where the year slider, the map buttons and the PIB toggle are handled without requests
+# The server is only asked for figures again when a different medal type is selected
+CLIENTSIDE_MAPS = os.environ.get("OLYMPICSDASH_CLIENTSIDE_MAPS", "0") == "1"
+
+# Throttled slider mode: while the slider is dragged the browser only requests a year once the slider has stayed
+# on it for SLIDER_THROTTLE_DELAY seconds, so the years passed over are never requested
+# After a year is rendered, the map and per country graphs of the previous and next years are built in the background
+SLIDER_THROTTLE = os.environ.get("OLYMPICSDASH_SLIDER_THROTTLE", "0") == "1"
+SLIDER_THROTTLE_DELAY = float(os.environ.get("OLYMPICSDASH_SLIDER_THROTTLE_DELAY", 0.05))
+# Maximum number of per country graphs (year and country) kept in memory
+PANEL_CACHE_SIZE = int(os.environ.get("OLYMPICSDASH_PANEL_CACHE_SIZE", 64))
+
+# Compact figures mode: map figures are sent in the compact encoding of figure_encoding.py and decoded in the browser,
+# the layout and trace properties shared by all of them are sent once with the page
+# Responses are compressed (gzip, or brotli if installed) and every map figure is also served, with an ETag, at
+# /figures/<map name>/<year>.json
+COMPACT_FIGURES = os.environ.get("OLYMPICSDASH_COMPACT_FIGURES", "0") == "1"
+# Maps whose figures are used to find the properties shared by all the figures
+FIGURE_DEFAULTS_MAPS = ["gold-medal", "pib-gold-medal"]
+
+# Background warm-up mode: the server starts as soon as the figures of the default view are built,
+# the rest of the map figures and the per country graphs of Spain in every year fill the caches in the background,
+# built by OLYMPICSDASH_WARMUP_WORKERS processes (one per core by default). Its progress is reported at /ready
+# It is started by the first request of every server process, so each forked worker warms up its own caches
+# Not used in preload mode, where everything is loaded before the workers of the server are forked
+BACKGROUND_WARMUP = os.environ.get("OLYMPICSDASH_BACKGROUND_WARMUP", "1") == "1"
+WARMUP_WORKERS = int(os.environ.get("OLYMPICSDASH_WARMUP_WORKERS", 0)) or None
+# Country whose per country graphs are shown until another one is clicked
+DEFAULT_COUNTRY = "ESP"
+
+# Hot reload mode: every OLYMPICSDASH_RELOAD_INTERVAL seconds a background thread checks whether the datasets
+# changed (e.g. rebuilt by build_datasets.py or extended by ingest_edition.py). Once they stop changing, a new
+# generation is loaded and warmed up next to the current one, then swapped in at once
+# Callbacks already running finish on the old generation, which is freed when the last of them finishes
+RELOAD = os.environ.get("OLYMPICSDASH_RELOAD", "0") == "1"
+RELOAD_INTERVAL = float(os.environ.get("OLYMPICSDASH_RELOAD_INTERVAL", 10))
+# Files watched by the reload mode: the datasets loaded by a generation and the manifest of the map figures
+RELOAD_DATASETS = [MedalsCountryDataset, MedalsDataset, GenderDataset, Top5SportsDataset, PIBDataset, MapFiguresDataset,
+                   MedalCubeDataset]
+RELOAD_SOURCES = [dataset.get_outputs()[0] for dataset in RELOAD_DATASETS]
+
+# Dictionary mapping button ids to medal types
+button_to_map = {
+    "gold-medal-button": "gold-medal",
+    "silver-medal-button": "silver-medal",
+    "bronze-medal-button": "bronze-medal",
+    "all-medal-button": "all-medals"
 }
-# Init medal figures
-def init_figures():
-    for medal_map in medal_maps.values():
-        medal_data = get_medal_dataframe(medals_df, medal_map["type"], medal_map["group"])
-        medal_map["figures"] = build_medals_figures(medal_data, medal_map["type"], medal_map["group"])
 
+prefetcher = Prefetcher()
+background_warmup = Warmup(WARMUP_WORKERS)
+reload_lock = threading.Lock()
+# Process running the reload thread, forked server workers start their own
+reload_pid = None
+warmup_lock = threading.Lock()
+# Process that started the background warm-up, forked server workers start their own
+warmup_pid = None
+
+
+# Everything built from one version of the datasets: the datasets, their indexes, the pre-serialized map figures
+# and the caches of the figures and graphs built from them
+# The dashboard serves the current generation. Callbacks take it once when they start and pass it along,
+# so all they return comes from the same generation even if a new one is swapped in meanwhile
+class Generation:
+    def __init__(self, number=1):
+        self.number = number
+        # Taken before loading, files changed while loading trigger another reload
+        self.sources = get_dataset_sources()
+        # Datasets shown by the dashboard
+        self.medals_c_df = MedalsCountryDataset.load_data()
+        self.medals_df = MedalsDataset.load_data()
+        self.gender_df = GenderDataset.load_data()
+        self.top5_df = Top5SportsDataset.load_data()
+        self.pib_df = PIBDataset.load_data()
+        # Per country data indexed by year and country for the per country panels
+        self.store = DatasetStore(self.gender_df, self.top5_df, self.medals_c_df, self.pib_df)
+        # Per country totals of any range of years for the year range mode
+        self.ranges = RangeStore(self.gender_df, self.medals_c_df, self.pib_df)
+        # Pre-serialized map figures built by build_datasets.py, None if they are missing or outdated
+        self.map_figures = MapFiguresDataset.load_data()
+        # Years in the slider, in order
+        self.years = sorted(int(year) for year in self.medals_df["Year"].unique())
+        # Medal counts by sport and sex for the map filters, None if the cube was not built or is outdated
+        self.medal_cube = MedalCubeDataset.load_data()
+        # Medal counts shared by all the map figures, built on the first figure built
+        self.medal_table = None
+        # Medal counts of the maps of every sport and sex filter, from slices of the medal cube
+        self.filtered_tables = {}
+        # Medal counts of the maps of the year range mode, built on the first range shown
+        self.range_table = None
+        # Properties shared by all the map figures, sent once to the browser in compact figures mode
+        self.figure_defaults = None
+        self.figure_cache = LRUCache(FIGURE_CACHE_SIZE)
+        self.panel_cache = LRUCache(PANEL_CACHE_SIZE)
+        self.map_store_cache = LRUCache(len(button_to_map))
+        self.layout = None
+
+    # The metrics report the caches of the current generation
+    def register_caches(self):
+        register_cache("figures", self.figure_cache)
+        register_cache("panels", self.panel_cache)
+        register_cache("map_store", self.map_store_cache)
+
+
+# Modification time and size of the watched files, None for missing files
+def get_dataset_sources():
+    sources = {}
+    for path in RELOAD_SOURCES:
+        try:
+            stat = os.stat(path)
+            sources[path] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            sources[path] = None
+    return sources
+
+def load_datasets():
+    global generation
+    generation = Generation()
+    generation.register_caches()
+
+def get_medal_table(gen):
+    if gen.medal_table is None:
+        gen.medal_table = build_medal_table(gen.medals_df)
+    return gen.medal_table
+
+def get_filtered_table(gen, sport, sex):
+    if (sport, sex) not in gen.filtered_tables:
+        gen.filtered_tables[sport, sex] = FilteredMedalTable(get_medal_table(gen), gen.medal_cube, sport, sex)
+    return gen.filtered_tables[sport, sex]
+
+def get_range_table(gen):
+    if gen.range_table is None:
+        gen.range_table = RangeMedalTable(get_medal_table(gen), gen.ranges)
+    return gen.range_table
+
+# Range of years (first year, last year) shown in the year range mode, None when a single year is shown
+def get_year_range(range_toggle, select_range):
+    if not range_toggle or not select_range:
+        return None
+    first_year, last_year = sorted(int(year) for year in select_range)
+    return first_year, last_year
+
+# Sport and sex shown by the map, filters the medal cube does not have (or all of them without a cube) show every medal
+def get_map_filters(gen, sport, sex):
+    if gen.medal_cube is None:
+        return ALL, ALL
+    return (sport if sport in gen.medal_cube.sport_index else ALL,
+            sex if sex in gen.medal_cube.sex_index else ALL)
+
+# Key of the figure of a map in a year (or range of years) in the figure cache
+def get_map_key(map_name, year, sport=ALL, sex=ALL):
+    return (map_name, year) if sport == ALL and sex == ALL else (map_name, year, sport, sex)
+
+# Load the pre-serialized figure of a map in a year, building it when there is none
+# Pre-serialized figures are plain dictionaries, so plotly does not have to build and validate them again
+# Maps filtered by sport or sex are always built, from a slice of the medal cube,
+# and so are the maps of a range of years (a (first year, last year) tuple), from the totals of the range
+def load_map_figure(gen, map_name, year, sport=ALL, sex=ALL):
+    medal_map = medal_maps[map_name]
+    if isinstance(year, tuple):
+        return build_medals_figure(get_range_table(gen), medal_map["type"], medal_map["group"], year)
+    if sport != ALL or sex != ALL:
+        return build_medals_figure(get_filtered_table(gen, sport, sex), medal_map["type"], medal_map["group"], year)
+    figure = MapFiguresDataset.load_figure(gen.map_figures, map_name, year) if gen.map_figures else None
+    if figure is None:
+        figure = build_medals_figure(get_medal_table(gen), medal_map["type"], medal_map["group"], year)
+    return figure
+
+# Get the figure of a map in a year, loading it if it is not cached
+def get_map_figure(gen, map_name, year, sport=ALL, sex=ALL):
+    return gen.figure_cache.get(get_map_key(map_name, year, sport, sex),
+                                lambda: load_map_figure(gen, map_name, year, sport, sex))
+
+# Get the figure of a map in a year as sent to the browser, in its compact encoding in compact figures mode
+def get_map_payload(gen, map_name, year, sport=ALL, sex=ALL):
+    if not COMPACT_FIGURES:
+        return get_map_figure(gen, map_name, year, sport, sex)
+    return gen.figure_cache.get(get_map_key(map_name, year, sport, sex) + ("compact",),
+                                lambda: get_figure_payload(gen, get_map_figure(gen, map_name, year, sport, sex)))
+
+def get_figure_payload(gen, figure):
+    return encode_figure(figure_to_dict(figure), gen.figure_defaults) if COMPACT_FIGURES else figure
+
+# Get the map sent by the map callbacks to the browser
+# In compact figures mode the maps of a year without filters are sent as the URL they are served at (serve_map_figure),
+# the browser fetches them and keeps them in its HTTP cache. Filtered maps and year ranges are sent in the response
+def get_map_response(gen, map_name, year, sport=ALL, sex=ALL):
+    if COMPACT_FIGURES and sport == ALL and sex == ALL and year in get_map_years(gen, map_name):
+        return {"url": get_relative_path(f"/figures/{map_name}/{int(year)}.json")}
+    return get_map_payload(gen, map_name, year, sport, sex)
+
+# Serve the figure of a map in a year, browsers only download it again if it changed
+def serve_map_figure(map_name, year):
+    gen = generation
+    if map_name not in medal_maps or year not in get_map_years(gen, map_name):
+        abort(404)
+    return make_cacheable_response(json.dumps(get_map_payload(gen, map_name, year), cls=PlotlyJSONEncoder))
+
+# Get the years with a figure for a map
+def get_map_years(gen, map_name):
+    if gen.map_figures and map_name in gen.map_figures["figures"]:
+        return gen.map_figures["figures"][map_name]
+    return [int(year) for year in get_medal_table(gen).get_years(medal_maps[map_name]["group"])]
+
+# Get the years before and after a year in the slider
+def get_adjacent_years(gen, year):
+    if year not in gen.years:
+        return []
+    position = gen.years.index(year)
+    return [gen.years[i] for i in (position - 1, position + 1) if 0 <= i < len(gen.years)]
+
+# Build in the background the map figures and per country graphs of the years next to the shown one
+# map_name or noc are None when only the per country graphs or the map are shown by the server
+def prefetch_adjacent_years(gen, year, map_name=None, noc=None, sport=ALL, sex=ALL):
+    for adjacent_year in get_adjacent_years(gen, year):
+        key = get_map_key(map_name, adjacent_year, sport, sex) + (("compact",) if COMPACT_FIGURES else ())
+        if map_name and key not in gen.figure_cache:
+            prefetcher.submit(("map", gen.number) + key,
+                              lambda year=adjacent_year: get_map_payload(gen, map_name, year, sport, sex))
+        if noc and (adjacent_year, noc) not in gen.panel_cache:
+            prefetcher.submit(("panels", gen.number, adjacent_year, noc),
+                              lambda year=adjacent_year: get_panels(gen, year, noc))
+
+# Year shown when the dashboard is opened: the latest one, where the year slider starts
+def get_default_year(gen):
+    return gen.years[-1]
+
+# Figures of the FIGURE_WARMUP maps in the default year
+def get_default_figures(gen):
+    return [(map_name, get_default_year(gen)) for map_name in FIGURE_WARMUP]
+
+# Init medal figures, the default figures unless others are given
+def init_figures(gen, warmup=None):
+    for map_name, year in warmup if warmup is not None else get_default_figures(gen):
+        get_map_figure(gen, map_name, year)
+
+# Every map figure of every year, loaded in preload mode
+def get_all_figures(gen):
+    return [(map_name, year) for map_name in medal_maps for year in get_map_years(gen, map_name)]
+
+# Load the figures needed before a generation is served, every map figure in preload mode
+def prepare_generation(gen, preload=False):
+    warmup = get_default_figures(gen)
+    if preload:
+        warmup = get_all_figures(gen)
+        gen.figure_cache.maxsize = max(gen.figure_cache.maxsize, len(warmup))
+    init_figures(gen, warmup)
+    if COMPACT_FIGURES:
+        gen.figure_defaults = get_figure_defaults([figure_to_dict(get_map_figure(gen, map_name, get_default_year(gen)))
+                                                   for map_name in FIGURE_DEFAULTS_MAPS])
+
+# Figures and per country graphs warmed up in the background: the latest years of every map first,
+# as many as fit in the caches
+def get_warmup_figures(gen):
+    figures = [(map_name, year) for year in reversed(gen.years) for map_name in medal_maps
+               if year in get_map_years(gen, map_name) and (map_name, year) not in gen.figure_cache]
+    panels = [(year, DEFAULT_COUNTRY) for year in reversed(gen.years) if (year, DEFAULT_COUNTRY) not in gen.panel_cache]
+    return (figures[:max(gen.figure_cache.maxsize - len(gen.figure_cache), 0)],
+            panels[:max(gen.panel_cache.maxsize - len(gen.panel_cache), 0)])
+
+def get_warmup_tasks(gen):
+    figures, panels = get_warmup_figures(gen)
+    return ([(("map", map_name, year), build_warmup_figure, (map_name, year),
+              lambda figure, key=(map_name, year): gen.figure_cache.set(key, figure)) for map_name, year in figures] +
+            [(("panels", year, noc), build_warmup_panels, (year, noc),
+              lambda panels, key=(year, noc): gen.panel_cache.set(key, panels)) for year, noc in panels])
+
+# Run by the warm-up worker processes on their copy of the current generation,
+# they return plain figure dictionaries to the server process
+def init_warmup_worker():
+    # Started processes (not forked) don't have the datasets of the server
+    if generation is None:
+        load_datasets()
+
+def build_warmup_figure(map_name, year):
+    return figure_to_dict(load_map_figure(generation, map_name, year))
+
+# The PIB graph is None when the country has no PIB that year, it is kept as None
+def build_warmup_panels(year, noc):
+    return tuple(figure_to_dict(panel) if panel is not None else None for panel in build_panels(generation, year, noc))
 
-def main():
-    init_figures()
-    #years = df["Year"].unique()
 
+# Load a new generation of the datasets next to the current one, warm it up and swap it in
+def reload_datasets():
+    global generation
+    with reload_lock:
+        print(f"[INFO] Loading datasets generation {generation.number + 1}")
+        new_generation = Generation(generation.number + 1)
+        prepare_generation(new_generation)
+        figures, panels = get_warmup_figures(new_generation)
+        init_figures(new_generation, figures)
+        for year, noc in panels:
+            get_panels(new_generation, year, noc)
+        generation = new_generation
+        new_generation.register_caches()
+    # Frees the old generation unless a callback is still using it
+    # Objects frozen by wsgi.py (gc.freeze) are never collected, so they are unfrozen first: the figures of the old
+    # generation form reference cycles. What is left is frozen again to keep the collections of the worker short
+    frozen = gc.get_freeze_count() > 0
+    gc.unfreeze()
+    gc.collect()
+    if frozen:
+        gc.freeze()
+    print(f"[SUCCESS] Datasets generation {new_generation.number} loaded")
+
+# Reloads the datasets once they changed and have not changed again for RELOAD_INTERVAL seconds,
+# so files being written by build_datasets.py are not loaded halfway
+def watch_datasets():
+    changed = None
+    while True:
+        time.sleep(RELOAD_INTERVAL)
+        sources = get_dataset_sources()
+        if sources == generation.sources or sources != changed:
+            changed = sources if sources != generation.sources else None
+            continue
+        changed = None
+        try:
+            reload_datasets()
+        except Exception as error:
+            print(f"[INFO] Datasets reload failed, the current generation is kept: {error}")
+
+# Started by the first request of every process, threads don't survive the fork of pre-forking servers
+def start_reload_watcher():
+    global reload_pid
+    if reload_pid == os.getpid():
+        return
+    with reload_lock:
+        if reload_pid != os.getpid():
+            reload_pid = os.getpid()
+            threading.Thread(target=watch_datasets, name="reload", daemon=True).start()
+
+# Started by the first request of every process (the first /ready check included), the process pool of the
+# warm-up and the callbacks filling the caches don't survive the fork of pre-forking servers
+def start_background_warmup():
+    global warmup_pid
+    if warmup_pid == os.getpid():
+        return
+    with warmup_lock:
+        if warmup_pid != os.getpid():
+            warmup_pid = os.getpid()
+            background_warmup.start(get_warmup_tasks(generation), initializer=init_warmup_worker)
+
+# Pages are built from the current generation, e.g. so the slider shows the years of a new edition
+def serve_layout():
+    gen = generation
+    if gen.layout is None:
+        gen.layout = build_layout(gen)
+    return gen.layout
+
+
+# Create the dashboard app, loading the datasets and the figures in FIGURE_WARMUP
+# In preload mode every map figure is loaded too, so the workers of a pre-forking server
+# share them with the master process instead of building them again (see wsgi.py)
+# Otherwise, in background warm-up mode, the rest of the figures are built once the app is created
+def create_app(preload=False):
+    load_datasets()
+    prepare_generation(generation, preload)
+
+    app = Dash(__name__)
     app.title = "OlympicsDash"
-    app.layout = html.Div(
+    app.layout = serve_layout
+    register_callbacks(app)
+    # Registered first so the size of the compressed responses is recorded
+    if METRICS_ENABLED:
+        enable_metrics(app.server)
+    if COMPACT_FIGURES:
+        enable_compression(app.server)
+        app.server.add_url_rule("/figures/<map_name>/<int:year>.json", "map_figure", serve_map_figure)
+    enable_health_checks(app.server, background_warmup)
+    if BACKGROUND_WARMUP and not preload:
+        app.server.before_request(start_background_warmup)
+    if RELOAD:
+        app.server.before_request(start_reload_watcher)
+    return app
+
+
+def build_layout(gen):
+    #years = df["Year"].unique()
+    # The map and the per country graphs start on the same year as the year slider
+    year = get_default_year(gen)
+    pib_graph, genre_graph, top5_graph, medals_country_graph = get_panels(gen, year, DEFAULT_COUNTRY)
+    return html.Div(
         children=[
             html.Div(id="title-sub-div", children=[
                 html.H1( id="title", children="OlympicsDash"),
@@ -112,21 +453,29 @@ def main():
                             html.Button(id="silver-medals-button", n_clicks_timestamp=0, children="SILVER"),
                             html.Button(id="bronze-medals-button", n_clicks_timestamp=0, children="BRONZE"),
                             html.Button(id="all-medals-button", n_clicks_timestamp=0, children="TOTAL"),
-                            dcc.Checklist(id="pib-toggle", options=["Show PIB"], value=["Show PIB"])
+                            dcc.Checklist(id="pib-toggle", options=["Show PIB"], value=["Show PIB"]),
+                            dcc.Checklist(id="range-toggle", options=["Year range"], value=[])
                         ])
                     ]),
+                    build_map_filters(gen),
                     
                     # Map and slider
                     dcc.Graph(
                         id='medals-graph',
-                        figure=medal_maps["pib-gold-medal"]["figures"][2016]
+                        figure=get_map_figure(gen, "pib-gold-medal", year)
                     ),
-                    build_year_slider(medals_df)
-                ]),
+                    html.Div(id="years-slider-div", children=[build_year_slider(gen.medals_df)]),
+                    html.Div(id="years-range-div", children=[build_year_range_slider(gen.medals_df)],
+                             style={"display": "none"})
+                ] + ([dcc.Store(id="map-store"), dcc.Store(id="range-map")] if CLIENTSIDE_MAPS else [])
+                  + ([dcc.Store(id="figure-defaults", data=gen.figure_defaults), dcc.Store(id="map-figure")]
+                     if COMPACT_FIGURES else [])
+                  + ([dcc.Store(id="year-request", data={"year": year, "delay": SLIDER_THROTTLE_DELAY})]
+                     if SLIDER_THROTTLE else [])),
                 html.Div(id="country_data", children=[
                     html.Div(className="cd_class", children=[
-                        html.Div(id="selected-country-text", className='selector', children="ESP"),
-                        html.Div(id="selected-year-text", className='selector', children="2016")
+                        html.Div(id="selected-country-text", className='selector', children=DEFAULT_COUNTRY),
+                        html.Div(id="selected-year-text", className='selector', children=str(year))
                     ]),
                     html.Div(id="graph_container", className="cd_class", 
                     children=[
@@ -136,7 +485,7 @@ def main():
                         dcc.Graph(
                             id='graph_pib_country',
                             className='grafico',
-                            figure=create_pib_graph(pib_df, 2016, "ESP")
+                            figure=pib_graph
                         )
                     ]),
                         html.Div(id="graph_genre_div",  className='grafico_div',
@@ -145,7 +494,7 @@ def main():
                             dcc.Graph(
                                 id='graph_genre',
                                 className='grafico',
-                                figure=create_genre_graph(gender_df, 2016, "ESP")
+                                figure=genre_graph
                             )
                         ]),
                         html.Div(id="graph_top_sports_div", className='grafico_div',
@@ -154,7 +503,7 @@ def main():
                             dcc.Graph(
                                 id='graph_top5',
                                 className='grafico',
-                                figure=create_top5_graph(top5_df, 2016, "ESP")
+                                figure=top5_graph
                             )]),
                         html.Div(id="graph_medals_country_div", className='grafico_div',
                         children=[
@@ -162,7 +511,7 @@ def main():
                             dcc.Graph(
                                 id='graph_medals_country',
                                 className='grafico',
-                                figure=create_medals_country_graph(medals_c_df, 2016, "ESP")
+                                figure=medals_country_graph
                             )
                         ])
                     ])
@@ -172,17 +521,23 @@ def main():
     )
 
 
+# Sport and gender filters of the map, only every sport and both genders can be selected without a medal cube
+def build_map_filters(gen):
+    sports = gen.medal_cube.sports[1:] if gen.medal_cube is not None else []
+    return html.Div(id="map-filters", children=[
+        dcc.Dropdown(id="sport-filter", options=[{"label": "All sports", "value": ALL}] + sports,
+                     value=ALL, clearable=False),
+        dcc.RadioItems(id="gender-filter", value=ALL, inline=True, options=[
+            {"label": "All", "value": ALL},
+            {"label": "Women", "value": "F", "disabled": gen.medal_cube is None},
+            {"label": "Men", "value": "M", "disabled": gen.medal_cube is None}
+        ])
+    ])
+
+
 # When a map selection button is clicked, the clicked button is disabled and all others enabled
-@app.callback(
-    Output('gold-medals-button', 'disabled'),
-    Output('silver-medals-button', 'disabled'),
-    Output('bronze-medals-button', 'disabled'),
-    Output('all-medals-button', 'disabled'),
-    Input('gold-medals-button', 'n_clicks_timestamp'),
-    Input('silver-medals-button', 'n_clicks_timestamp'),
-    Input('bronze-medals-button', 'n_clicks_timestamp'),
-    Input('all-medals-button', 'n_clicks_timestamp')
-)
+# In client side maps mode the same is done in the browser by olympicsdash.update_buttons (assets/clientside.js)
+@timed("callback_seconds")
 def update_buttons_click(gold_click, silver_click, bronze_click, all_click):
     # Map input times to button ids
     clicks_buttons = {
@@ -200,25 +555,60 @@ def update_buttons_click(gold_click, silver_click, bronze_click, all_click):
     return tuple(disabled)
 
 
-# Dictionary mapping button ids to medal types
-button_to_map = {
-    "gold-medal-button": "gold-medal",
-    "silver-medal-button": "silver-medal",
-    "bronze-medal-button": "bronze-medal",
-    "all-medal-button": "all-medals"
-}
-# Update shown figure depending on disabled button and selected country
-@app.callback(
-    Output('title-text', 'children'),
-    Output('medals-graph', 'figure'),
-    Input('years-slider', "drag_value"),
-    Input('gold-medals-button', 'disabled'),
-    Input('silver-medals-button', 'disabled'),
-    Input('bronze-medals-button', 'disabled'),
-    Input('all-medals-button', 'disabled'),
-    Input('pib-toggle', 'value')
-)
-def update_graph(select_year, gold_disabled, silver_disabled, bronze_disabled, all_disabled, pib_toggle):
+# Show either the single year slider or the range slider of the year range mode
+@timed("callback_seconds")
+def show_year_sliders(range_toggle):
+    return ({"display": "none"}, None) if range_toggle else (None, {"display": "none"})
+
+# Update shown figure depending on disabled button, selected year (or range of years) and sport and gender filters
+# The sport and gender filters only apply to single years
+@timed("callback_seconds")
+def update_graph(select_year, gold_disabled, silver_disabled, bronze_disabled, all_disabled, pib_toggle,
+                 sport=ALL, sex=ALL, range_toggle=None, select_range=None):
+    gen = generation
+    map_name = get_selected_map(gold_disabled, silver_disabled, bronze_disabled, all_disabled, pib_toggle)
+    year_range = get_year_range(range_toggle, select_range)
+    if year_range:
+        return get_map_title(map_name, year_range), get_map_payload(gen, map_name, year_range)
+    sport, sex = get_map_filters(gen, sport, sex)
+    # Return medal name and selected yearly map
+    return medal_maps[map_name]["name"], get_map_response(gen, map_name, select_year, sport, sex)
+
+# Same as update_graph, for the years requested in throttled slider mode
+@timed("callback_seconds")
+def update_graph_throttled(year_request, gold_disabled, silver_disabled, bronze_disabled, all_disabled, pib_toggle,
+                           sport=ALL, sex=ALL, range_toggle=None, select_range=None):
+    if not year_request:
+        raise PreventUpdate
+    gen = generation
+    map_name = get_selected_map(gold_disabled, silver_disabled, bronze_disabled, all_disabled, pib_toggle)
+    year_range = get_year_range(range_toggle, select_range)
+    if year_range:
+        return get_map_title(map_name, year_range), get_map_payload(gen, map_name, year_range)
+    sport, sex = get_map_filters(gen, sport, sex)
+    figure = get_map_response(gen, map_name, year_request["year"], sport, sex)
+    prefetch_adjacent_years(gen, year_request["year"], map_name=map_name, sport=sport, sex=sex)
+    return medal_maps[map_name]["name"], figure
+
+# Map of the range of years in year range mode, for client side maps mode where the yearly maps are in the browser
+# None outside of the year range mode, so olympicsdash.update_graph shows the yearly maps again
+@timed("callback_seconds")
+def update_range_map(gold_disabled, silver_disabled, bronze_disabled, all_disabled, pib_toggle,
+                     range_toggle, select_range):
+    year_range = get_year_range(range_toggle, select_range)
+    if not year_range:
+        return None
+    # Gold medals are shown until a button is disabled
+    if not any([gold_disabled, silver_disabled, bronze_disabled, all_disabled]):
+        gold_disabled = True
+    map_name = get_selected_map(gold_disabled, silver_disabled, bronze_disabled, all_disabled, pib_toggle)
+    return {"name": get_map_title(map_name, year_range), "figure": get_map_payload(generation, map_name, year_range)}
+
+def get_map_title(map_name, year_range):
+    return f"{medal_maps[map_name]['name']} {year_range[0]}-{year_range[1]}"
+
+# Get the selected map from the disabled button and the pib toggle
+def get_selected_map(gold_disabled, silver_disabled, bronze_disabled, all_disabled, pib_toggle):
     # Map button states to button ids
     disabled_buttons = {
         "gold-medal-button": gold_disabled,
@@ -226,71 +616,196 @@ def update_graph(select_year, gold_disabled, silver_disabled, bronze_disabled, a
         "bronze-medal-button": bronze_disabled,
         "all-medal-button": all_disabled
     }
-    # Get all selected yearly maps by finding disabled button
-    disabled_map = None
+    # Get the selected map by finding disabled button
+    map_name = None
     for button, disabled in disabled_buttons.items():
         if disabled:
             map_name = ("pib-" if len(pib_toggle) > 0 else "") + button_to_map[button]
-            disabled_map = medal_maps[map_name]
             break
-    
-    # Return medal name and selected yearly map
-    return disabled_map["name"], disabled_map["figures"][select_year]
+    return map_name
+
+# Yearly figures of the medal type of the disabled button, for its map with and without PIB data
+# Sent once to the browser in client side maps mode, where olympicsdash.update_graph picks the figure to show
+# Built from the pre-serialized figures when available and cached per medal type and filters
+@timed("callback_seconds")
+def update_map_store(gold_disabled, silver_disabled, bronze_disabled, all_disabled, sport=ALL, sex=ALL):
+    disabled_buttons = {
+        "gold-medal-button": gold_disabled,
+        "silver-medal-button": silver_disabled,
+        "bronze-medal-button": bronze_disabled,
+        "all-medal-button": all_disabled
+    }
+    # Gold medals are shown until a button is disabled
+    button = next((button for button, disabled in disabled_buttons.items() if disabled), "gold-medal-button")
+    gen = generation
+    sport, sex = get_map_filters(gen, sport, sex)
+    return gen.map_store_cache.get((button, sport, sex),
+                                   lambda: build_map_store(gen, button_to_map[button], sport, sex))
+
+def build_map_store(gen, map_name, sport=ALL, sex=ALL):
+    map_store = {}
+    for variant, variant_name in [("continent", map_name), ("pib", "pib-" + map_name)]:
+        map_store[variant] = {
+            "name": medal_maps[variant_name]["name"],
+            "figures": {year: get_figure_payload(gen, load_map_figure(gen, variant_name, year, sport, sex))
+                        for year in get_map_years(gen, variant_name)}
+        }
+    return map_store
 
 # Show the selected country
-@app.callback(
-    Output('selected-country-text', 'children'),
-    Input('medals-graph', 'clickData'),
-    Input('selected-country-text', 'children')
-)
+@timed("callback_seconds")
 def print_country(select_country, selected_cc):
     return selected_cc if not select_country else select_country["points"][0]["location"]
 
 # Show the selected year
-@app.callback(
-    Output('selected-year-text', 'children'),
-    Input('years-slider', 'drag_value'),
-    Input('selected-year-text', 'children')
-)
-def print_year(select_year, selected_year):
+# In throttled slider mode the same is done in the browser by olympicsdash.print_year (assets/clientside.js)
+@timed("callback_seconds")
+def print_year(select_year, selected_year, range_toggle=None, select_range=None):
+    year_range = get_year_range(range_toggle, select_range)
+    if year_range:
+        return f"{year_range[0]}-{year_range[1]}"
     return selected_year if not select_year else select_year
 
-# Build the genre graph
-@app.callback(
-    Output('graph_genre', 'figure'),
-    Input('selected-year-text', 'children'),
-    Input('selected-country-text', 'children')
-)
-def update_genre(sel_year, sel_country):
-    return create_genre_graph(gender_df, int(sel_year), sel_country)
-
-# Build the top 5 sports graph
-@app.callback(
-    Output('graph_top5', 'figure'),
-    Input('selected-year-text', 'children'),
-    Input('selected-country-text', 'children')
-)
-def update_sports(sel_year, sel_country):
-    return create_top5_graph(top5_df, int(sel_year), sel_country)
-
-# Build the medals per country graph
-@app.callback(
-    Output('graph_medals_country', 'figure'),
-    Input('selected-year-text', 'children'),
-    Input('selected-country-text', 'children')
-)
-def update_medals(sel_year, sel_country):
-    return create_medals_country_graph(medals_c_df, int(sel_year), sel_country)
-
-# Build the pib graph
-@app.callback(
-    Output('graph_pib_country', 'figure'),
-    Input('selected-year-text', 'children'),
-    Input('selected-country-text', 'children')
-)
-def update_pib(sel_year, sel_country):
-    return create_pib_graph(pib_df, int(sel_year), sel_country)
+
+# Build the per country graphs (pib, genre, top 5 sports and medals) in a single request
+# The year and country are taken from the slider and the map click, the country defaults to Spain until one is clicked
+# In year range mode the graphs show the totals of the range of the range slider
+@timed("callback_seconds")
+def update_panels(select_year, select_country, range_toggle=None, select_range=None):
+    gen = generation
+    year = get_year_range(range_toggle, select_range) or (int(select_year) if select_year else get_default_year(gen))
+    noc = select_country["points"][0]["location"] if select_country else DEFAULT_COUNTRY
+    return get_panels(gen, year, noc)
+
+# Same as update_panels, for the years requested in throttled slider mode
+@timed("callback_seconds")
+def update_panels_throttled(year_request, select_country, range_toggle=None, select_range=None):
+    if not year_request:
+        raise PreventUpdate
+    noc = select_country["points"][0]["location"] if select_country else DEFAULT_COUNTRY
+    gen = generation
+    year_range = get_year_range(range_toggle, select_range)
+    if year_range:
+        return get_panels(gen, year_range, noc)
+    panels = get_panels(gen, year_request["year"], noc)
+    prefetch_adjacent_years(gen, year_request["year"], noc=noc)
+    return panels
+
+
+# Get the per country graphs of a country in a year (or range of years), building them if they are not cached
+def get_panels(gen, year, noc):
+    return gen.panel_cache.get((year, noc), lambda: build_panels(gen, year, noc))
+
+def build_panels(gen, year, noc):
+    if isinstance(year, tuple):
+        return build_range_panels(gen, *year, noc)
+    return (
+        create_pib_graph(gen.store.get_pib(noc), year),
+        create_genre_graph(gen.store.get_gender(year, noc)),
+        create_top5_graph(gen.store.get_top5(year, noc)),
+        create_medals_country_graph(gen.store.get_medals_country(year, noc))
+    )
+
+# The medals and participants of a range come from the cumulative sums of the range store,
+# its top 5 sports from the medal cube (none without a cube)
+def build_range_panels(gen, first_year, last_year, noc):
+    top5 = gen.medal_cube.get_top_sports(noc, first_year, last_year, TOP_SPORTS) if gen.medal_cube else None
+    return (
+        create_pib_graph(gen.store.get_pib(noc), first_year, last_year),
+        create_genre_graph(gen.ranges.get_gender(first_year, last_year, noc)),
+        create_top5_graph(top5),
+        create_medals_country_graph(gen.ranges.get_medals_country(first_year, last_year, noc))
+    )
+
+# Register the callbacks of the enabled modes
+def register_callbacks(app):
+    buttons_callback = [
+        Output('gold-medals-button', 'disabled'),
+        Output('silver-medals-button', 'disabled'),
+        Output('bronze-medals-button', 'disabled'),
+        Output('all-medals-button', 'disabled'),
+        Input('gold-medals-button', 'n_clicks_timestamp'),
+        Input('silver-medals-button', 'n_clicks_timestamp'),
+        Input('bronze-medals-button', 'n_clicks_timestamp'),
+        Input('all-medals-button', 'n_clicks_timestamp')
+    ]
+    if CLIENTSIDE_MAPS:
+        app.clientside_callback(ClientsideFunction(namespace="olympicsdash", function_name="update_buttons"), *buttons_callback)
+    else:
+        app.callback(*buttons_callback)(update_buttons_click)
+
+    # In compact figures mode the server sends the figure to map-figure, where it is decoded in the browser
+    graph_callback = [
+        Output('title-text', 'children'),
+        Output('map-figure', 'data') if COMPACT_FIGURES and not CLIENTSIDE_MAPS else Output('medals-graph', 'figure'),
+        Input('years-slider', "drag_value")
+    ]
+    map_buttons_inputs = [
+        Input('gold-medals-button', 'disabled'),
+        Input('silver-medals-button', 'disabled'),
+        Input('bronze-medals-button', 'disabled'),
+        Input('all-medals-button', 'disabled')
+    ]
+    map_filters_inputs = [Input('sport-filter', 'value'), Input('gender-filter', 'value')]
+    range_inputs = [Input('range-toggle', 'value'), Input('years-range-slider', 'value')]
+    app.callback(Output('years-slider-div', 'style'), Output('years-range-div', 'style'),
+                 Input('range-toggle', 'value'))(show_year_sliders)
+    if SLIDER_THROTTLE:
+        # Debounces the slider moves in the browser, the delay is read from the previous request
+        app.clientside_callback(ClientsideFunction(namespace="olympicsdash", function_name="request_year"),
+                                Output('year-request', 'data'), Input('years-slider', 'drag_value'),
+                                State('year-request', 'data'))
+    if CLIENTSIDE_MAPS:
+        app.callback(Output('map-store', 'data'), *map_buttons_inputs, *map_filters_inputs)(update_map_store)
+        app.callback(Output('range-map', 'data'), *map_buttons_inputs, Input('pib-toggle', 'value'),
+                     *range_inputs)(update_range_map)
+        app.clientside_callback(ClientsideFunction(namespace="olympicsdash", function_name="update_graph"),
+                                *graph_callback, Input('pib-toggle', 'value'), Input('map-store', 'data'),
+                                Input('range-map', 'data'),
+                                *([State('figure-defaults', 'data')] if COMPACT_FIGURES else []))
+    elif SLIDER_THROTTLE:
+        app.callback(*graph_callback[:2], Input('year-request', 'data'),
+                     *map_buttons_inputs, Input('pib-toggle', 'value'), *map_filters_inputs,
+                     *range_inputs)(update_graph_throttled)
+    else:
+        app.callback(*graph_callback, *map_buttons_inputs, Input('pib-toggle', 'value'),
+                     *map_filters_inputs, *range_inputs)(update_graph)
+    if COMPACT_FIGURES and not CLIENTSIDE_MAPS:
+        app.clientside_callback(ClientsideFunction(namespace="olympicsdash", function_name="decode_figure"),
+                                Output('medals-graph', 'figure'), Input('map-figure', 'data'),
+                                State('figure-defaults', 'data'))
+
+    app.callback(
+        Output('selected-country-text', 'children'),
+        Input('medals-graph', 'clickData'),
+        Input('selected-country-text', 'children')
+    )(print_country)
+
+    year_callback = [
+        Output('selected-year-text', 'children'),
+        Input('years-slider', 'drag_value'),
+        Input('selected-year-text', 'children'),
+        *range_inputs
+    ]
+    if SLIDER_THROTTLE:
+        app.clientside_callback(ClientsideFunction(namespace="olympicsdash", function_name="print_year"), *year_callback)
+    else:
+        app.callback(*year_callback)(print_year)
+
+    panels_callback = [
+        Output('graph_pib_country', 'figure'),
+        Output('graph_genre', 'figure'),
+        Output('graph_top5', 'figure'),
+        Output('graph_medals_country', 'figure')
+    ]
+    if SLIDER_THROTTLE:
+        app.callback(*panels_callback, Input('year-request', 'data'),
+                     Input('medals-graph', 'clickData'), *range_inputs)(update_panels_throttled)
+    else:
+        app.callback(*panels_callback, Input('years-slider', 'drag_value'),
+                     Input('medals-graph', 'clickData'), *range_inputs)(update_panels)
+
 
 if __name__ == "__main__":
-    main()
+    app = create_app()
     app.run_server(debug=True)
@@ -0,0 +1,137 @@
+import functools
+import os
+import threading
+import time
+
+from flask import Response, request
+
+# Metrics of the server, exposed in the Prometheus text format at /metrics
+# - Latency histograms of every callback and figure builder (functions decorated with timed)
+# - Hits and misses of the caches (registered with register_cache)
+# - Size of the responses sent, per callback output or route
+# Enabled with OLYMPICSDASH_METRICS=1, when disabled timed returns the functions as they are
+METRICS_ENABLED = os.environ.get("OLYMPICSDASH_METRICS", "0") == "1"
+METRICS_PREFIX = "olympicsdash"
+SECONDS_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+BYTES_BUCKETS = [256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304]
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            for i, bucket in enumerate(self.buckets):
+                if value <= bucket:
+                    self.counts[i] += 1
+                    break
+            self.count += 1
+            self.sum += value
+
+    # Cumulative counts of every bucket, total count and sum
+    def collect(self):
+        with self.lock:
+            cumulative = []
+            total = 0
+            for count in self.counts:
+                total += count
+                cumulative.append(total)
+            return cumulative, self.count, self.sum
+
+
+# Histograms by metric name and label value, with the help text and label name of every metric
+HISTOGRAMS = {}
+HISTOGRAM_HELP = {
+    "callback_seconds": ("callback", "Time spent in the Dash callbacks"),
+    "figure_build_seconds": ("builder", "Time spent building figures"),
+    "response_bytes": ("path", "Size of the responses, per callback output or route")
+}
+# Caches whose hits and misses are exported, by name
+CACHES = {}
+lock = threading.Lock()
+
+
+def get_histogram(metric, label, buckets=SECONDS_BUCKETS):
+    key = (metric, label)
+    if key not in HISTOGRAMS:
+        with lock:
+            HISTOGRAMS.setdefault(key, Histogram(buckets))
+    return HISTOGRAMS[key]
+
+
+# Records the time spent in every call of the decorated function, labelled with the function name
+def timed(metric):
+    def decorator(function):
+        if not METRICS_ENABLED:
+            return function
+        histogram = get_histogram(metric, function.__name__)
+
+        @functools.wraps(function)
+        def timed_function(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return timed_function
+    return decorator
+
+
+# Caches need hits and misses attributes (see figure_cache.LRUCache), they are read when the metrics are collected
+def register_cache(name, cache):
+    CACHES[name] = cache
+
+
+# Callback requests are labelled with their outputs, any other request with its route
+def observe_response_size(response):
+    if response.direct_passthrough:
+        return response
+    path = request.url_rule.rule if request.url_rule else "unknown"
+    if request.path.endswith("_dash-update-component"):
+        body = request.get_json(silent=True) or {}
+        path = body.get("output", path)
+    get_histogram("response_bytes", path, BYTES_BUCKETS).observe(response.calculate_content_length() or 0)
+    return response
+
+
+def format_labels(label_name, label):
+    return '%s="%s"' % (label_name, str(label).replace("\\", "\\\\").replace('"', '\\"'))
+
+
+def render_metrics():
+    lines = []
+    for metric, (label_name, help_text) in HISTOGRAM_HELP.items():
+        name = f"{METRICS_PREFIX}_{metric}"
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for (histogram_metric, label), histogram in sorted(HISTOGRAMS.items(), key=lambda item: str(item[0])):
+            if histogram_metric != metric:
+                continue
+            labels = format_labels(label_name, label)
+            cumulative, count, total = histogram.collect()
+            for bucket, bucket_count in zip(histogram.buckets, cumulative):
+                lines.append(f'{name}_bucket{{{labels},le="{bucket}"}} {bucket_count}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"{name}_sum{{{labels}}} {total}")
+            lines.append(f"{name}_count{{{labels}}} {count}")
+    for counter in ["hits", "misses"]:
+        name = f"{METRICS_PREFIX}_cache_{counter}_total"
+        lines += [f"# HELP {name} Cache {counter}", f"# TYPE {name} counter"]
+        for cache_name, cache in CACHES.items():
+            lines.append(f"{name}{{{format_labels('cache', cache_name)}}} {getattr(cache, counter)}")
+    return "\n".join(lines) + "\n"
+
+
+def serve_metrics():
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
+# Adds the /metrics route and the response size hook to the server
+# Register it before any hook changing the responses (e.g. compression), so the size sent is recorded
+def enable_metrics(server):
+    server.after_request(observe_response_size)
+    server.add_url_rule("/metrics", "metrics", serve_metrics)
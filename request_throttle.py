@@ -0,0 +1,27 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Runs tasks in the background, a task with the same key as a pending one is not queued again
+# Used to fill caches ahead of the requests, the results of the tasks are discarded
+class Prefetcher:
+    def __init__(self, workers=1):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self.pending = set()
+        self.lock = threading.Lock()
+
+    def submit(self, key, task):
+        with self.lock:
+            if key in self.pending:
+                return
+            self.pending.add(key)
+        self.executor.submit(self.run, key, task)
+
+    def run(self, key, task):
+        try:
+            task()
+        except Exception as error:
+            print(f"[INFO] Prefetch of {key} failed: {error}")
+        finally:
+            with self.lock:
+                self.pending.discard(key)
@@ -0,0 +1,97 @@
+// Static version of the dashboard, exported by export_static.py
+// The map figures and the per country graphs are JSON shards in data/, fetched when they are first shown:
+// - data/manifest.json: years, maps and the defaults of the compact figures
+// - data/figures/<map name>/<year>.json: compact figure of a map in a year
+// - data/panels/<NOC>.json: compact per country graphs (pib, genre, top 5 sports, medals) of every year of a country
+// Figures are decoded by decode_figure, shared with the dashboard (clientside.js)
+
+const panel_ids = ["graph_pib_country", "graph_genre", "graph_top5", "graph_medals_country"];
+const shards = {};
+
+// Every shard is fetched once, missing shards resolve to null
+function load_shard(path) {
+    if (!(path in shards)) {
+        shards[path] = fetch("data/" + path).then(response => response.ok ? response.json() : null);
+    }
+    return shards[path];
+}
+
+function show_figure(element_id, figure) {
+    Plotly.react(element_id, figure.data || [], figure.layout);
+}
+
+const state = {};
+
+function get_map_name() {
+    return (state.pib ? "pib-" : "") + state.map;
+}
+
+async function update_graph(manifest) {
+    const map_name = get_map_name();
+    const year = state.year;
+    const medal_map = manifest.maps[map_name];
+    document.getElementById("title-text").textContent = medal_map.name;
+    // Years without a figure show the empty map
+    const figure = medal_map.years.includes(year) ? await load_shard(`figures/${map_name}/${year}.json`) : null;
+    // Skip the update if another map or year was selected meanwhile, shards can arrive out of order
+    if (map_name !== get_map_name() || year !== state.year) {
+        return;
+    }
+    show_figure("medals-graph", decode_figure(figure || {layout: {}, data: []}, manifest.figure_defaults));
+}
+
+async function update_panels(manifest) {
+    const noc = state.noc;
+    const year = state.year;
+    document.getElementById("selected-country-text").textContent = noc;
+    document.getElementById("selected-year-text").textContent = String(year);
+    const panels = await load_shard(`panels/${noc}.json`);
+    // Skip the update if another country or year was selected meanwhile
+    if (noc !== state.noc || year !== state.year) {
+        return;
+    }
+    const year_panels = panels && panels[year];
+    panel_ids.forEach((element_id, i) => show_figure(element_id, year_panels && year_panels[i]
+        ? decode_figure(year_panels[i], manifest.panel_defaults) : manifest.empty_panel));
+}
+
+function update_buttons() {
+    document.querySelectorAll("#buttons button").forEach(button => {
+        button.disabled = button.dataset.map === state.map;
+    });
+}
+
+async function init() {
+    const manifest = await load_shard("manifest.json");
+    Object.assign(state, manifest.initial);
+
+    const slider = document.getElementById("years-slider");
+    slider.max = manifest.years.length - 1;
+    slider.value = manifest.years.indexOf(state.year);
+    slider.addEventListener("input", () => {
+        state.year = manifest.years[Number(slider.value)];
+        update_graph(manifest);
+        update_panels(manifest);
+    });
+    document.querySelectorAll("#buttons button").forEach(button => button.addEventListener("click", () => {
+        state.map = button.dataset.map;
+        update_buttons();
+        update_graph(manifest);
+    }));
+    const pib_toggle = document.getElementById("pib-toggle-input");
+    pib_toggle.checked = state.pib;
+    pib_toggle.addEventListener("change", () => {
+        state.pib = pib_toggle.checked;
+        update_graph(manifest);
+    });
+
+    update_buttons();
+    await update_graph(manifest);
+    document.getElementById("medals-graph").on("plotly_click", event => {
+        state.noc = event.points[0].location;
+        update_panels(manifest);
+    });
+    update_panels(manifest);
+}
+
+init();
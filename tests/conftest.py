@@ -0,0 +1,18 @@
+import importlib.util
+import os
+import sys
+import types
+
+# Tests import the modules of the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# dataset_preprocessor.py only imports awoc to find the continent of the countries it resolves
+# Without the library installed, a stub gives every country the same continent, enough to compare both engines
+if importlib.util.find_spec("awoc") is None:
+    class AWOC:
+        def get_countries(self):
+            import pycountry
+            return [{"ISO3": country.alpha_3, "Continent Name": "Europe"} for country in pycountry.countries]
+
+    sys.modules["awoc"] = types.ModuleType("awoc")
+    sys.modules["awoc"].AWOC = AWOC
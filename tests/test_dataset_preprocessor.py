@@ -0,0 +1,74 @@
+import csv
+import io
+import os
+
+import dataset_preprocessor
+from benchmarks.synthetic import generate, ATHLETES_FILE, PIB_FILE
+
+# Both engines of dataset_preprocessor.py must write the exact same CSV, byte by byte,
+# checked on synthetic inputs so the real CSVs are not needed
+SYNTHETIC_SCALE = 0.02
+# Smaller than the synthetic CSV so the table engine enriches it in several chunks
+CHUNK_SIZE = 1000
+
+
+def preprocess(tmp_path, engine):
+    output_path = os.path.join(tmp_path, f"athlete_events_with_pib.{engine}.csv")
+    dataset_preprocessor.preprocess(os.path.join(tmp_path, ATHLETES_FILE), os.path.join(tmp_path, PIB_FILE),
+                                    output_path, CHUNK_SIZE, engine, os.path.join(tmp_path, "country_index.csv"))
+    with open(output_path, "rb") as output_file:
+        return output_file.read(), dict(dataset_preprocessor.PROGRESS), dict(dataset_preprocessor.DROPPED)
+
+
+def test_engines_write_the_same_csv(tmp_path):
+    generate(tmp_path, SYNTHETIC_SCALE)
+    rows_output, rows_progress, rows_dropped = preprocess(tmp_path, "rows")
+    table_output, table_progress, table_dropped = preprocess(tmp_path, "table")
+    assert rows_progress["written"] > 0
+    assert rows_dropped == table_dropped
+    assert (rows_progress["read"], rows_progress["written"]) == (table_progress["read"], table_progress["written"])
+    assert rows_output == table_output
+
+
+# The PIBs are written as they appear in the PIB CSV, floats that don't survive a parse and repr round trip included
+def test_table_engine_keeps_the_pib_text(tmp_path):
+    generate(tmp_path, SYNTHETIC_SCALE)
+    pib_texts = set(dataset_preprocessor.load_pib_table(os.path.join(tmp_path, PIB_FILE))["PIB"])
+    output, _, _ = preprocess(tmp_path, "table")
+    rows = list(csv.reader(io.StringIO(output.decode())))[1:]
+    pibs = {row[dataset_preprocessor.ATHLETES_PIB] for row in rows}
+    assert pibs and pibs <= pib_texts
+
+
+# Rewrites the synthetic PIB CSV keeping the year columns up to last_year and adding the given new years
+def rewrite_pib_years(tmp_path, last_year, new_years=()):
+    pib_path = os.path.join(tmp_path, PIB_FILE)
+    with open(pib_path, newline="", encoding="utf-8-sig") as pib_file:
+        rows = list(csv.reader(pib_file))
+    end = rows[0].index(str(last_year)) + 1
+    rows = [row[:end] + [str(year) if i == 0 else "1.5" for year in new_years] + [""] for i, row in enumerate(rows)]
+    with open(pib_path, "w", newline="", encoding="utf-8-sig") as pib_file:
+        csv.writer(pib_file, quoting=csv.QUOTE_ALL).writerows(rows)
+
+
+# Athletes of years missing from the PIB CSV are written with an empty PIB by both engines
+def test_engines_agree_on_years_missing_from_the_pib_csv(tmp_path):
+    generate(tmp_path, SYNTHETIC_SCALE)
+    rewrite_pib_years(tmp_path, 2000)
+    rows_output, _, _ = preprocess(tmp_path, "rows")
+    table_output, _, _ = preprocess(tmp_path, "table")
+    assert rows_output == table_output
+    rows = list(csv.reader(io.StringIO(table_output.decode())))[1:]
+    assert any(int(row[dataset_preprocessor.ATHLETES_YEAR]) > 2000 for row in rows)
+    assert all(row[dataset_preprocessor.ATHLETES_PIB] == "" for row in rows
+               if int(row[dataset_preprocessor.ATHLETES_YEAR]) > 2000)
+
+
+# Year columns added by newer PIB CSVs are read up to the last one
+def test_pib_years_are_read_from_the_headers(tmp_path):
+    generate(tmp_path, SYNTHETIC_SCALE)
+    rewrite_pib_years(tmp_path, 2021, [2022, 2023])
+    pib_path = os.path.join(tmp_path, PIB_FILE)
+    pibs_c, _ = dataset_preprocessor.load_pibs(pib_path)
+    assert list(next(iter(pibs_c.values())))[-2:] == ["2022", "2023"]
+    assert set(dataset_preprocessor.load_pib_table(pib_path)["Year"]) == {str(year) for year in range(1960, 2024)}
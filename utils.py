@@ -6,17 +6,12 @@ from plotly.subplots import make_subplots
 
 from dash import dcc
 
+from metrics import timed
+
 GRAPH_HEIGHT = 200
 GRAPH_WIDTH = 300
 
 
-# Get the yearly sum of medals of a type
-def get_medal_dataframe(df, medal_type, group_type):
-    group_keys = ["Year", "NOC", "Team", group_type]
-    medal_df = df[group_keys + [medal_type]].groupby(group_keys).sum().reset_index()
-    return medal_df
-
-
 # Build a slider object to select which year to display in the dashboard map
 # It sets up the minimum and maximum year, all the acceptable years and the starting year
 def build_year_slider(df):
@@ -28,6 +23,16 @@ def build_year_slider(df):
     )
     return slider
 
+# Build a range slider to select the range of years to add up in the year range mode
+def build_year_range_slider(df):
+    years = df["Year"].unique()
+    slider = dcc.RangeSlider(
+        id='years-range-slider', min=int(min(years)), max=int(max(years)),
+        step=None, value=[int(min(years)), int(max(years))], allowCross=False,
+        marks=dict(sorted({int(year): str(year) for year in years}.items()))
+    )
+    return slider
+
 def empty_graph(msg):
     return {
         "layout": {
@@ -56,126 +61,16 @@ def empty_graph(msg):
         }
     }
 
-def build_medals_figures_continent(medals_df, medal_type):
-    years = medals_df["Year"].unique()
-    continents = medals_df["Continent"].unique()
-    fig_years = {}
-    colors = ["red", "orange", "yellow", "green", "blue", "purple"]
-
-
-    for year in years:
-        fig = go.Figure()
-        df_medals_year = medals_df[medals_df["Year"] == year]
-        for i, continent in enumerate(continents):
-            df_sub = df_medals_year.loc[(df_medals_year["Continent"] == continent)]
-            fig.add_trace(go.Scattergeo(
-                locations = df_sub['NOC'],
-                geo = "geo",
-                marker = dict(
-                    size=df_sub[medal_type]**1.4,
-                    color = colors[i],
-                    line_color='rgb(40,40,40)',
-                    line_width=0.5,
-                    sizemode = 'area'
-                ),
-                text=df_sub[medal_type],
-                legendgrouptitle = {"text": "Continent", "font": {"color": "#000000", "size": 16}},
-                name = continent,
-                hovertemplate="%{location}<br>%{text} medals",
-            ))
-        fig.update_layout(
-            geo = dict(
-                bgcolor="#292929",
-                landcolor="rgba(221, 217, 217, 1)"
-            ),
-            paper_bgcolor = "#292929",
-            legend = dict(
-                bgcolor = "rgba(221, 217, 217, 0.757)",
-                itemwidth=40,
-                itemsizing = 'constant',
-                font=dict(
-                    family="Lexend",
-                    color= "black",
-                    size=14
-                )
-            ),
-            margin={"r": 0, "t": 25, "l": 0, "b":25}
-        )
-        fig_years[year] = fig
-    return fig_years
-
-
-def build_medals_figures_pib(medals_df, medal_type):
-    medals_df["PIB"] = medals_df['PIB'].div(1e9).round(0)
-    medals_df = medals_df[["Year", "NOC", "Team", medal_type, "PIB"]].groupby(["Year", "NOC", "Team", "PIB"]).sum().reset_index()
-    years = medals_df["Year"].unique()
-    fig_years = {}
-    colors = ["yellow","green", "blue", "purple"]
-    q3,q2,q1 = np.percentile(medals_df['PIB'].unique(), [75, 50, 25])
-
-    limits = [(0,q1),(q1,q2),(q2,q3),(q3,max(medals_df["PIB"]))]
-
-
-    for year in years:
-        fig = go.Figure()
-        df_medals_year = medals_df[medals_df["Year"] == year]
-        for i in range(len(limits)):
-            lim = limits[i]
-            df_sub = df_medals_year.loc[(df_medals_year["PIB"]>=lim[0]) & (df_medals_year["PIB"]<=lim[1])]
-            # print(df_sub)
-            fig.add_trace(go.Scattergeo(
-                locations = df_sub['NOC'],
-                geo = "geo",
-                marker = dict(
-                    size=df_sub[medal_type]**1.4,
-                    color = colors[i],
-                    line_color='rgb(40,40,40)',
-                    line_width=0.5,
-                    sizemode = 'area'
-                ),
-                text=df_sub[medal_type],
-                legendgrouptitle = {"text": "PIB in Billion USD", "font": {"color": "#000000", "size": 16}},
-                name = '{0} - {1}'.format(lim[0],lim[1]),
-                hovertemplate="%{location}<br>%{text} medals"
-            ))
-        fig.update_layout(
-            geo = go.layout.Geo(
-                bgcolor="#292929",
-                landcolor="rgba(221, 217, 217, 1)"
-            ),
-            paper_bgcolor = "#292929",
-            legend = dict(
-                bgcolor = "rgba(221, 217, 217, 0.757)",
-                itemwidth=40,
-                itemsizing = 'constant',
-                font=dict(
-                    family="Lexend",
-                    color= "black",
-                    size=14
-                )
-            ),
-            margin={"r": 0, "t": 25, "l": 0, "b":25}
-        )
-        fig_years[year] = fig
-    return fig_years
-
-group_types = {
-    "Continent": build_medals_figures_continent,
-    "PIB": build_medals_figures_pib
-}
-# Build the dictionary of yearly medals for a medal type
-def build_medals_figures(medals_df, medal_type, group_type):
-    return group_types[group_type](medals_df, medal_type)
-
 # Creates the genre graphs and returns it
-def create_genre_graph(gender_df, year, noc):
-    """ Creates a participations per genre graph. """
+@timed("figure_build_seconds")
+def create_genre_graph(values):
+    """ Creates a participations per genre graph from the participants [Women, Men] of a country in a year. """
     # Auxiliar information
     colors = ["#FE90C0","#9ACDDD"]
     labels = ['Women','Men']
+    if values is None:
+        return empty_graph("Not matching data found.")
     try:
-        # We obtain the number of participants per gender given a year and a country from the dataframe.
-        values = gender_df.loc[(gender_df["Year"]==year) & (gender_df["NOC"]==noc)].iloc[:,-2:].values[0].tolist()
         # Percentaje to show it in the title.
         perc = round(max(values)/(max(values)+min(values))*100,1)
         # Title information.
@@ -192,11 +87,12 @@ def create_genre_graph(gender_df, year, noc):
     except:
         return empty_graph("Not matching data found.")
 
-def create_top5_graph(top5_df, year, noc):
-    """ Creates a top 5 sports per country in a year graph. """
+@timed("figure_build_seconds")
+def create_top5_graph(values):
+    """ Creates a top 5 sports per country in a year graph from the 5 best [Sport, Medals] pairs. """
+    if values is None:
+        return empty_graph("Not matching data found.")
     try:
-        # We get the 5 best sports and medals for the country and year given using the dataframe.
-        values = top5_df.loc[(top5_df["Year"]==year) & (top5_df["NOC"]==noc)].iloc[:,2:].values[0].tolist()
         colors = ["#80A3AE", "#9ACDDD", "#F29F9F", "#B6DB94", "#F9F4A6"]
         # Inverse range from 5 to 1.
         y = [i for i in range(5,0,-1)]
@@ -215,14 +111,15 @@ def create_top5_graph(top5_df, year, noc):
         return empty_graph("Not matching data found.")
     
 
-def create_medals_country_graph(med_df, year, noc):
-    """ Creates a medals per country in a year graph. """
+@timed("figure_build_seconds")
+def create_medals_country_graph(values):
+    """ Creates a medals per country in a year graph from the [Gold, Silver, Bronze] medals won. """
     # Auxiliar information
     colors = ["#DFD082","#7D8398","#B98A67"]
     labels = ['Gold','Silver', 'Bronze']
+    if values is None:
+        return empty_graph("Not matching data found.")
     try:
-        # We get the number of gold, silver and bronze medals from the dataframe.
-        values = med_df.loc[(med_df["Year"]==year) & (med_df["NOC"]==noc)].iloc[:,-3:].values[0].tolist()
         if sum(values) == 0:
             return empty_graph("No medals won.")
         # Pie chart.
@@ -235,11 +132,13 @@ def create_medals_country_graph(med_df, year, noc):
     except:
         return empty_graph("Not matching data found.")
 
-def create_pib_graph(pib_df, year, noc):
-    """ Creates a PIB per country graph """
-    # Gets all the values for a given country in the PIB dataframe.
+@timed("figure_build_seconds")
+def create_pib_graph(values, year, last_year=None):
+    """ Creates a PIB per country graph from the yearly PIB and medals of the country.
+    The years from year to last_year are remarked when a range of years is given. """
+    if values is None:
+        return empty_graph("Not matching data found.")
     try:
-        values = pib_df.loc[(pib_df["NOC"]==noc)]
         # Insert the different categories into arrays.
         years = values["Year"].values
         medals = values["Medals"].values
@@ -248,7 +147,14 @@ def create_pib_graph(pib_df, year, noc):
         colors = ['#7D8398'] * len(years)
         # If we don't have data for that year we cannot create the graph.
         try:
-            colors[list(years).index(year)] = "#62b7b3"
+            if last_year is None:
+                colors[list(years).index(year)] = "#62b7b3"
+            else:
+                selected = [i for i, value in enumerate(years) if year <= value <= last_year]
+                if not selected:
+                    return None
+                for i in selected:
+                    colors[i] = "#62b7b3"
         except:
             return None
         # We need two graphs, so we make a template.
@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import jsonify
+
+
+# Fills the caches of the server in the background, once it is already serving requests
+# Every task is a (key, function, args, store) tuple: function(*args) runs in a pool of worker processes,
+# one per core by default, and store(result) is called with its result in the server process
+# The functions and their results are sent between processes, so they must be module level functions
+# returning plain data (e.g. figure dictionaries). Threads are used when processes can't be started
+class Warmup:
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.lock = threading.Lock()
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self.started = None
+        self.finished = None
+
+    # initializer runs once in every worker process, e.g. to load the datasets when they are not inherited
+    def start(self, tasks, initializer=None):
+        self.total = len(tasks)
+        self.started = time.perf_counter()
+        if not tasks:
+            self.finished = self.started
+            return
+        print(f"[INFO] Warming up {self.total} figures and graphs in the background with {self.workers} workers")
+        executor = get_executor(self.workers, initializer)
+        for key, function, args, store in tasks:
+            future = executor.submit(function, *args)
+            future.add_done_callback(lambda future, key=key, store=store: self.finish(key, future, store))
+        executor.shutdown(wait=False)
+
+    def finish(self, key, future, store):
+        try:
+            store(future.result())
+        except Exception as error:
+            print(f"[INFO] Warm-up of {key} failed: {error}")
+            with self.lock:
+                self.failed += 1
+        with self.lock:
+            self.done += 1
+            if self.done == self.total:
+                self.finished = time.perf_counter()
+                print(f"[SUCCESS] Warm-up finished in {self.finished - self.started:.1f}s")
+
+    def get_progress(self):
+        with self.lock:
+            elapsed = (self.finished or time.perf_counter()) - self.started if self.started else 0
+            return {
+                "ready": self.done == self.total,
+                "done": self.done,
+                "failed": self.failed,
+                "total": self.total,
+                "progress": self.done / self.total if self.total else 1,
+                "seconds": round(elapsed, 3)
+            }
+
+
+# The pool is tried before it is used, so threads are used instead if its processes fail to start
+def get_executor(workers, initializer):
+    try:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=initializer)
+        executor.submit(os.getpid).result()
+        return executor
+    except (OSError, NotImplementedError, ImportError, BrokenProcessPool) as error:
+        print(f"[INFO] Warm-up processes unavailable ({error}), using threads")
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="warmup")
+
+
+# Adds the /health and /ready routes to the server, for load balancers and orchestrators:
+# - /health answers 200 as long as the server is up
+# - /ready answers 200 once the warm-up finished and 503 until then, both with the progress of the warm-up
+def enable_health_checks(server, warmup):
+    server.add_url_rule("/health", "health", lambda: jsonify({"status": "ok"}))
+
+    def serve_ready():
+        progress = warmup.get_progress()
+        return jsonify(progress), 200 if progress["ready"] else 503
+    server.add_url_rule("/ready", "ready", serve_ready)
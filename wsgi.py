@@ -0,0 +1,18 @@
+import gc
+import os
+
+from main import create_app
+
+# Entry point for production servers, e.g. with gunicorn:
+#   gunicorn --preload --workers 4 --bind 0.0.0.0:8050 wsgi:server
+# With --preload this module is imported once by the master process: the datasets and (in preload mode)
+# every map figure are loaded before the workers are forked, and the workers share them copy-on-write
+# Preload mode is enabled by default, set OLYMPICSDASH_PRELOAD=0 to load only the FIGURE_WARMUP figures
+PRELOAD = os.environ.get("OLYMPICSDASH_PRELOAD", "1") == "1"
+
+app = create_app(preload=PRELOAD)
+server = app.server
+
+# Everything loaded so far is moved out of reach of the garbage collector, so the collections run by the
+# workers don't write to the shared objects, which would copy their memory pages in every worker
+gc.freeze()